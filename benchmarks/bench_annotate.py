@@ -0,0 +1,57 @@
+"""
+比較舊的逐框繪製迴圈與 AnnotationRenderer 在每張畫面 10/50/200 個偵測框時的耗時.
+
+用法: python -m benchmarks.bench_annotate --repeat 200
+"""
+
+import argparse
+
+import cv2
+import numpy as np
+from ultralytics.engine.results import Results
+
+from benchmarks.fixtures import OBJECT_NAMES, measure, random_boxes_result
+from pmc_5axis_yolo.utils import AnnotationRenderer, LabelRegistry, generate_colors
+
+
+def legacy_draw(frame: np.ndarray, object_result: Results, class_names: dict) -> np.ndarray:
+    """原本 predict_result 中逐框呼叫 cv2 繪製的迴圈"""
+    colors = generate_colors(len(class_names))
+    combined_frame = frame.copy()
+    for object in object_result.boxes:
+        x1, y1, x2, y2 = map(int, object.xyxy[0].tolist())
+        confidence = object.conf[0]
+        class_id = int(object.cls[0])
+        class_name = class_names[class_id] if class_id < len(class_names) else f"class_{class_id}"
+        color = colors[class_id]
+        cv2.rectangle(combined_frame, (x1, y1), (x2, y2), color, 2)
+        label = f"{class_name} {confidence:.2f}"
+        (text_width, text_height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        text_y1 = y1 - text_height - 4 if y1 - text_height - 4 > 0 else y1
+        cv2.rectangle(combined_frame, (x1, text_y1), (x1 + text_width, text_y1 + text_height + 4), color, -1)
+        cv2.putText(
+            combined_frame, label, (x1, text_y1 + text_height + 2), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1
+        )
+    return combined_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    renderer = AnnotationRenderer(LabelRegistry(OBJECT_NAMES))
+    buffer = frame.copy()
+
+    print(f"{'boxes':>6} {'legacy ms':>10} {'renderer ms':>12} {'speedup':>8}")
+    for num_boxes in (10, 50, 200):
+        result = random_boxes_result(frame, num_boxes)
+        legacy = measure(lambda: legacy_draw(frame, result, OBJECT_NAMES), args.repeat)["mean_ms"]
+        # renderer 直接畫在重複使用的 buffer 上
+        fast = measure(lambda: renderer.draw(buffer, result), args.repeat)["mean_ms"]
+        print(f"{num_boxes:>6} {legacy:>10.3f} {fast:>12.3f} {legacy / fast:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+比較舊的顯示流程 (cvtColor + QImage + Qt 縮放) 與 FrameDisplay 每張畫面的耗時與記憶體配置.
+
+用法: python -m benchmarks.bench_display --repeat 300
+"""
+
+import argparse
+import os
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2
+import numpy as np
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtWidgets import QApplication, QLabel
+
+from benchmarks.fixtures import measure
+from pmc_5axis_yolo.utils import FrameDisplay
+
+
+def legacy_show(label: QLabel, frame: np.ndarray):
+    """原本的顯示方式: 每張畫面 cvtColor 配置新陣列，再由 Qt 縮放大張 pixmap"""
+    height, width, channel = frame.shape
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    image = QImage(rgb.data, width, height, width * channel, QImage.Format.Format_RGB888)
+    pixmap = QPixmap.fromImage(image).scaled(label.size(), Qt.AspectRatioMode.IgnoreAspectRatio)
+    label.setPixmap(pixmap)
+
+
+def measure_memory(fn, repeat: int) -> tuple[float, float]:
+    """回傳 (ms/frame, Python 端配置的峰值 KiB)"""
+    fn()
+    tracemalloc.start()
+    elapsed = measure(fn, repeat, warmup=0)["mean_ms"]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    frame = np.random.default_rng(0).integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+
+    label = QLabel()
+    label.setFixedSize(512, 288)
+    display = FrameDisplay(label)
+
+    for name, fn in (("legacy", lambda: legacy_show(label, frame)), ("FrameDisplay", lambda: display.show(frame))):
+        ms, kib = measure_memory(fn, args.repeat)
+        print(f"{name:<13} {ms:7.3f} ms/frame  peak {kib:9.1f} KiB")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+比較每個 tick 的延遲：循序執行兩個模型 vs. InferenceEngine 並行批次推論.
+
+用法: python -m benchmarks.bench_engine --cameras 3 --ticks 30
+模型依照 settings.INFERENCE_BACKEND 載入。
+"""
+
+import argparse
+import os
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")  # 只量測 CPU
+
+import cv2
+
+from benchmarks.fixtures import measure, sequential_predict
+from pmc_5axis_yolo.settings import DEFAULT_OFFSETS, OBJECT_MODEL, POSE_MODEL
+from pmc_5axis_yolo.tasks.backends import load_model
+from pmc_5axis_yolo.tasks.engine import InferenceEngine
+
+
+def report(name: str, stats: dict):
+    print(f"{name:<12} mean {stats['mean_ms']:8.2f} ms  p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", default="images/1.jpg")
+    parser.add_argument("--cameras", type=int, default=3)
+    parser.add_argument("--ticks", type=int, default=30)
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.image)
+    frames = [frame.copy() for _ in range(args.cameras)]
+    pose_model = load_model(POSE_MODEL)
+    object_model = load_model(OBJECT_MODEL)
+    engine = InferenceEngine(pose_model, object_model, use_roi=False, track=False)
+
+    sequential = measure(
+        lambda: sequential_predict(frames, pose_model, object_model, DEFAULT_OFFSETS), args.ticks, warmup=1
+    )
+    parallel = measure(lambda: engine.predict_result(frames, DEFAULT_OFFSETS), args.ticks, warmup=1)
+    engine.close()
+
+    print(f"{args.cameras} cameras, {args.ticks} ticks, CPU")
+    report("sequential", sequential)
+    report("engine", parallel)
+    print(f"speedup      {sequential['mean_ms'] / parallel['mean_ms']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+比較每張畫面重新呼叫 generate_colors 與查詢 LabelRegistry 的耗時.
+
+用法: python -m benchmarks.bench_palette --repeat 10000
+"""
+
+import argparse
+
+from benchmarks.fixtures import OBJECT_NAMES, measure
+from pmc_5axis_yolo.utils import generate_colors, get_registry
+
+
+def per_frame_legacy(num_boxes: int):
+    """舊流程: 每張畫面重建顏色表並組合標籤文字"""
+    colors = generate_colors(len(OBJECT_NAMES))
+    for i in range(num_boxes):
+        class_id = i % len(OBJECT_NAMES)
+        _ = colors[class_id], f"{OBJECT_NAMES[class_id]} {0.5:.2f}"
+
+
+def per_frame_registry(num_boxes: int):
+    registry = get_registry(OBJECT_NAMES)
+    for i in range(num_boxes):
+        class_id = i % len(OBJECT_NAMES)
+        _ = registry.color(class_id), registry.label(class_id, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10000)
+    parser.add_argument("--boxes", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, fn in (("generate_colors", per_frame_legacy), ("LabelRegistry", per_frame_registry)):
+        elapsed = measure(lambda: fn(args.boxes), args.repeat, warmup=1)["mean_ms"] * 1000
+        print(f"{name:<16} {elapsed:8.2f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+比較舊的逐人 classify_pose 與批次 classify_poses 在 1/5/20 人時的耗時.
+
+用法: python -m benchmarks.bench_pose --repeat 2000
+"""
+
+import argparse
+
+import numpy as np
+import torch
+
+from benchmarks.fixtures import measure
+from pmc_5axis_yolo.settings import (
+    ARM_ANGLE_THRESHOLD,
+    ARM_BEND_THRESHOLD,
+    ARM_STRETCH_THRESHOLD,
+    LIE_THRESHOLD,
+)
+from pmc_5axis_yolo.tasks.predict import PoseState, classify_poses
+from pmc_5axis_yolo.utils import calculate_angle
+
+
+def legacy_classify_pose(keypoints: torch.Tensor) -> PoseState:
+    """原本以 torch 張量逐一判斷單人姿態的 classify_pose"""
+    left_shoulder, right_shoulder = keypoints[5].tolist(), keypoints[6].tolist()
+    left_elbow, right_elbow = keypoints[7].tolist(), keypoints[8].tolist()
+    left_wrist, right_wrist = keypoints[9].tolist(), keypoints[10].tolist()
+    left_hip, right_hip = keypoints[11].tolist(), keypoints[12].tolist()
+    left_knee, right_knee = keypoints[13].tolist(), keypoints[14].tolist()
+    avg_hip_y = (left_hip[1] + right_hip[1]) / 2 if left_hip[1] != 0 and right_hip[1] != 0 else left_hip[1] or right_hip[1]
+    avg_knee_y = (
+        (left_knee[1] + right_knee[1]) / 2 if left_knee[1] != 0 and right_knee[1] != 0 else left_knee[1] or right_knee[1]
+    )
+    avg_shoulder_y = (
+        (left_shoulder[1] + right_shoulder[1]) / 2
+        if left_shoulder[1] != 0 and right_shoulder[1] != 0
+        else left_shoulder[1] or right_shoulder[1]
+    )
+    left_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
+    right_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
+    if (avg_hip_y != 0 and avg_shoulder_y != 0 and avg_hip_y - avg_shoulder_y < LIE_THRESHOLD) or (
+        avg_knee_y != 0 and avg_hip_y != 0 and avg_knee_y - avg_hip_y < LIE_THRESHOLD
+    ):
+        return PoseState.LIE
+    if (left_angle > ARM_ANGLE_THRESHOLD or right_angle > ARM_ANGLE_THRESHOLD) and (
+        (left_wrist[1] != 0 and (avg_hip_y == 0 or avg_hip_y - left_wrist[1] > ARM_STRETCH_THRESHOLD))
+        or (right_wrist[1] != 0 and (avg_hip_y == 0 or avg_hip_y - right_wrist[1] > ARM_STRETCH_THRESHOLD))
+    ):
+        return PoseState.ARM_STRETCH
+    elif (left_wrist[1] != 0 and (avg_hip_y == 0 or avg_hip_y - left_wrist[1] > ARM_BEND_THRESHOLD)) or (
+        right_wrist[1] != 0 and (avg_hip_y == 0 or avg_hip_y - right_wrist[1] > ARM_BEND_THRESHOLD)
+    ):
+        return PoseState.ARM_BEND
+    if (avg_hip_y != 0 and avg_shoulder_y != 0 and avg_hip_y > avg_shoulder_y) and (
+        avg_knee_y != 0 and avg_hip_y != 0 and avg_knee_y > avg_hip_y
+    ):
+        return PoseState.STAND
+    return PoseState.UNKNOWN
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'persons':>8} {'legacy us':>10} {'batched us':>11} {'speedup':>8}")
+    for persons in (1, 5, 20):
+        keypoints = rng.uniform(0, 1, (persons, 17, 2)).astype(np.float32)
+        tensor = torch.from_numpy(keypoints)
+
+        legacy_states = [legacy_classify_pose(tensor[i]) for i in range(persons)]
+        assert classify_poses(keypoints) == legacy_states, "batched result differs from legacy"
+
+        # measure 回傳 ms，這裡以 us 顯示
+        legacy = measure(lambda: [legacy_classify_pose(tensor[i]) for i in range(persons)], args.repeat)
+        batched = measure(lambda: classify_poses(tensor.numpy()), args.repeat)
+        legacy, batched = legacy["mean_ms"] * 1000, batched["mean_ms"] * 1000
+        print(f"{persons:>8} {legacy:>10.1f} {batched:>11.1f} {legacy / batched:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
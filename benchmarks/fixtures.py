@@ -0,0 +1,197 @@
+"""
+基準量測共用的工具: 計時、固定亂數種子產生的假 Results 與假模型，不需要下載模型也能在 CPU 上重現量測.
+
+FakeModel 與 ultralytics.YOLO 有相同的 names / predict 介面，可直接交給 InferenceEngine 與 sequential_predict。
+"""
+
+from __future__ import annotations
+
+import statistics
+import time
+from typing import TYPE_CHECKING
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from pmc_5axis_yolo.settings import OBJECT_CONF, POSE_CONF, PREDICT_VERBOSE
+from pmc_5axis_yolo.tasks.predict import Behavior, judge_results
+from pmc_5axis_yolo.utils import load_images
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+
+OBJECT_NAMES = {0: "base", 1: "feed", 2: "knife", 3: "stop"}
+POSE_NAMES = {0: "person"}
+
+
+def measure(fn, repeat: int, warmup: int = 3) -> dict:
+    """每次呼叫的耗時 (ms) 統計；fps 為每秒可處理的呼叫次數"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    mean = statistics.mean(times)
+    return {
+        "repeat": repeat,
+        "mean_ms": mean,
+        "p50_ms": statistics.median(times),
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "fps": 1000 / mean if mean else 0.0,
+    }
+
+
+# 站立的人的 COCO 關鍵點 (正規化座標)，手腕在胸前
+STANDING = np.array(
+    [
+        [0.50, 0.15],  # nose
+        [0.48, 0.13],
+        [0.52, 0.13],
+        [0.46, 0.14],
+        [0.54, 0.14],
+        [0.42, 0.25],  # shoulders
+        [0.58, 0.25],
+        [0.40, 0.38],  # elbows
+        [0.60, 0.38],
+        [0.42, 0.45],  # wrists
+        [0.58, 0.45],
+        [0.45, 0.55],  # hips
+        [0.55, 0.55],
+        [0.45, 0.72],  # knees
+        [0.55, 0.72],
+        [0.45, 0.90],  # ankles
+        [0.55, 0.90],
+    ],
+    dtype=np.float32,
+)
+
+
+def sequential_predict(
+    image: str | MatLike | list, pose_model, object_model, offsets: dict
+) -> tuple[list[MatLike], Behavior]:
+    """原本 predict_result 的循序推論（姿態模型執行完才執行物件模型），作為 InferenceEngine 的比較基準"""
+    pose_results = pose_model.predict(image, conf=POSE_CONF, verbose=PREDICT_VERBOSE)
+    object_results = object_model.predict(image, conf=OBJECT_CONF, verbose=PREDICT_VERBOSE)
+    return judge_results(pose_results, object_results, object_model.names, offsets)
+
+
+def fake_pose_result(frame: MatLike, persons: int = 1, seed: int = 0) -> Results:
+    """persons 個站立的人，依序往右排列並加上少量抖動"""
+    import torch
+    from ultralytics.engine.results import Results
+
+    rng = np.random.default_rng(seed)
+    height, width = frame.shape[:2]
+    shifts = np.linspace(0, 0.3, persons) if persons > 1 else np.zeros(1)
+    xy = STANDING[None] + rng.normal(0, 0.005, (persons, 17, 2)).astype(np.float32)
+    xy[..., 0] += shifts[:persons, None] - 0.15 * (persons > 1)
+    xy = np.clip(xy, 0, 1) * np.array([width, height], dtype=np.float32)
+    conf = rng.uniform(0.6, 1.0, (persons, 17, 1)).astype(np.float32)
+    keypoints = np.concatenate([xy, conf], axis=2)
+
+    x1, y1 = xy.min(axis=1).T
+    x2, y2 = xy.max(axis=1).T
+    box_conf = np.sort(rng.uniform(0.8, 1.0, persons))[::-1]  # 與模型輸出相同，依置信度排序
+    boxes = np.stack([x1, y1, x2, y2, box_conf, np.zeros(persons)], axis=1).astype(np.float32)
+    return Results(
+        frame, path="", names=POSE_NAMES, boxes=torch.from_numpy(boxes), keypoints=torch.from_numpy(keypoints)
+    )
+
+
+def fake_object_result(frame: MatLike, num_boxes: int = 8, seed: int = 0) -> Results:
+    """stop / feed 按鈕在第一個人的手腕附近、刀具在底座上方，其餘為隨機的偵測框"""
+    import torch
+    from ultralytics.engine.results import Results
+
+    rng = np.random.default_rng(seed)
+    height, width = frame.shape[:2]
+    scale = np.array([width, height, width, height], dtype=np.float32)
+    fixed = np.array(
+        [
+            [0.37, 0.40, 0.47, 0.50, 0.9, 3],  # stop
+            [0.53, 0.40, 0.63, 0.50, 0.9, 1],  # feed
+            [0.70, 0.30, 0.75, 0.62, 0.8, 2],  # knife
+            [0.65, 0.60, 0.90, 0.80, 0.8, 0],  # base
+        ],
+        dtype=np.float32,
+    )
+    fixed[:, :4] *= scale
+
+    extra = max(0, num_boxes - len(fixed))
+    x1 = rng.uniform(0, width - 60, extra)
+    y1 = rng.uniform(0, height - 60, extra)
+    w = rng.uniform(20, 60, extra)
+    h = rng.uniform(20, 60, extra)
+    conf = rng.uniform(0.1, 0.7, extra)
+    cls = rng.integers(0, len(OBJECT_NAMES), extra)
+    random_boxes = np.stack([x1, y1, x1 + w, y1 + h, conf, cls], axis=1).astype(np.float32)
+
+    boxes = np.concatenate([fixed, random_boxes])
+    boxes = boxes[np.argsort(-boxes[:, 4])]
+    return Results(frame, path="", names=OBJECT_NAMES, boxes=torch.from_numpy(boxes))
+
+
+def random_boxes_result(frame: MatLike, num_boxes: int, seed: int = 0) -> Results:
+    """num_boxes 個隨機位置、類別與置信度的偵測框（量測繪製成本用）"""
+    import torch
+    from ultralytics.engine.results import Results
+
+    rng = np.random.default_rng(seed)
+    height, width = frame.shape[:2]
+    x1 = rng.uniform(0, width - 60, num_boxes)
+    y1 = rng.uniform(0, height - 60, num_boxes)
+    w = rng.uniform(20, 60, num_boxes)
+    h = rng.uniform(20, 60, num_boxes)
+    conf = rng.uniform(0.1, 1.0, num_boxes)
+    cls = rng.integers(0, len(OBJECT_NAMES), num_boxes)
+    data = np.stack([x1, y1, x1 + w, y1 + h, conf, cls], axis=1).astype(np.float32)
+    return Results(frame, path="", names=OBJECT_NAMES, boxes=torch.from_numpy(data))
+
+
+class FakeModel:
+    """
+    回傳固定 fixture 的模型；第 i 張畫面使用種子 seed + i，同一輸入的結果永遠相同.
+
+    work > 0 時每張輸入先像 YOLO 一樣縮放到 imgsz（預設 640），再執行 work 次高斯模糊，
+    模擬與輸入大小成正比的推論成本，ROI 以較小的 imgsz 推論的效果因此可以被量測到。
+    """
+
+    def __init__(self, task: str = "detect", persons: int = 1, num_boxes: int = 8, seed: int = 0, work: int = 0):
+        if task not in ("detect", "pose"):
+            raise ValueError(f"Unknown task: {task}")
+        self.task = task
+        self.names = POSE_NAMES if task == "pose" else OBJECT_NAMES
+        self.persons = persons
+        self.num_boxes = num_boxes
+        self.seed = seed
+        self.work = work
+
+    def _simulate(self, frame: MatLike, imgsz: int):
+        height, width = frame.shape[:2]
+        scale = imgsz / max(height, width)
+        image = cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))))
+        for _ in range(self.work):
+            image = cv2.GaussianBlur(image, (0, 0), 3)
+
+    def predict(
+        self, source, conf: float = 0.25, verbose: bool = False, imgsz: int = 640, **kwargs
+    ) -> list[Results]:
+        results = []
+        for idx, frame in enumerate(load_images(source)):
+            if self.work:
+                self._simulate(frame, imgsz)
+            if self.task == "pose":
+                result = fake_pose_result(frame, self.persons, self.seed + idx)
+            else:
+                result = fake_object_result(frame, self.num_boxes, self.seed + idx)
+            results.append(result[result.boxes.conf >= conf])
+        return results
+
+
+def fake_models(persons: int = 1, num_boxes: int = 8, work: int = 0) -> tuple[FakeModel, FakeModel]:
+    """(pose_model, object_model)"""
+    return FakeModel("pose", persons, work=work), FakeModel("detect", num_boxes=num_boxes, work=work)
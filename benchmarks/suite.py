@@ -0,0 +1,155 @@
+"""
+偵測流程各階段與端到端的基準量測，輸出 JSON 以便比對不同版本的 FPS.
+
+階段: classify_pose、extract_object_regions、predict_safe、annotate、convert2QImage (單獨量測)，
+以及 sequential (兩個模型循序執行)、engine (InferenceEngine 並行)、engine_roi (只在 ROI 內偵測物件)
+與 engine_track (偵測並追蹤) 的端到端量測。
+假模型以 --work 模擬與輸入大小成正比的推論成本，engine_roi 才量得到較小 imgsz 的效果。
+
+用法:
+    python -m benchmarks.suite --models fake --json outputs/bench.json
+    python -m benchmarks.suite --models real --cameras 3 --baseline outputs/bench.json --max-regression 0.1
+--models fake 使用 benchmarks.fixtures 的固定假結果，不需要模型檔；real 依 settings.INFERENCE_BACKEND 載入模型。
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")  # 只量測 CPU
+
+import cv2
+import numpy as np
+import torch
+
+from benchmarks.fixtures import fake_models, measure, sequential_predict
+from pmc_5axis_yolo.settings import DEFAULT_OFFSETS, OBJECT_MODEL, POSE_MODEL
+from pmc_5axis_yolo.tasks.engine import InferenceEngine
+from pmc_5axis_yolo.tasks.predict import (
+    annotate_results,
+    classify_poses,
+    keypoints_to_numpy,
+    predict_safe,
+)
+from pmc_5axis_yolo.utils import convert2QImage, extract_object_regions
+
+TARGETS = ["stop", "feed", "knife", "base"]
+
+
+def load_frames(patterns: list[str], cameras: int) -> list[np.ndarray]:
+    """依檔名排序讀取圖片，循環補足 cameras 張畫面"""
+    paths = sorted(path for pattern in patterns for path in glob.glob(pattern))
+    images = [image for image in (cv2.imread(path) for path in paths) if image is not None]
+    if not images:
+        raise FileNotFoundError(f"No images found: {patterns}")
+    return [images[i % len(images)] for i in range(cameras)]
+
+
+def run(args: argparse.Namespace) -> dict:
+    frames = load_frames(args.images, args.cameras)
+    if args.models == "fake":
+        pose_model, object_model = fake_models(args.persons, args.boxes, args.work)
+    else:
+        from pmc_5axis_yolo.tasks.backends import load_model
+
+        pose_model, object_model = load_model(POSE_MODEL), load_model(OBJECT_MODEL)
+
+    # 單獨量測的階段都使用同一組推論結果
+    pose_results = pose_model.predict(frames)
+    object_results = object_model.predict(frames)
+    keypoints = [keypoints_to_numpy(result.keypoints, normalized=True) for result in pose_results]
+    annotated = annotate_results(pose_results, object_results, object_model.names)
+    offsets = DEFAULT_OFFSETS.copy()
+
+    stages = {
+        "classify_pose": lambda: [classify_poses(points) for points in keypoints],
+        "extract_object_regions": lambda: [extract_object_regions(result, TARGETS) for result in object_results],
+        "predict_safe": lambda: predict_safe(pose_results, object_results, offsets),
+        "annotate": lambda: annotate_results(pose_results, object_results, object_model.names),
+        "convert2QImage": lambda: [convert2QImage(image) for image in annotated],
+        "sequential": lambda: sequential_predict(frames, pose_model, object_model, offsets),
+    }
+    results = {}
+    for name, fn in stages.items():
+        results[name] = measure(fn, args.repeat)
+        print(f"{name:<24} {results[name]['mean_ms']:9.3f} ms  {results[name]['fps']:9.1f} /s")
+
+    for name, use_roi, track in (("engine", False, False), ("engine_roi", True, False), ("engine_track", False, True)):
+        engine = InferenceEngine(pose_model, object_model, use_roi=use_roi, track=track)
+        try:
+            # 預熱的推論同時設定 ROI
+            results[name] = measure(lambda: engine.process(frames, offsets), args.repeat)
+        finally:
+            engine.close()
+        print(f"{name:<24} {results[name]['mean_ms']:9.3f} ms  {results[name]['fps']:9.1f} /s")
+
+    return {
+        "meta": {
+            "models": args.models,
+            "cameras": args.cameras,
+            "persons": args.persons if args.models == "fake" else None,
+            "boxes": args.boxes if args.models == "fake" else None,
+            "work": args.work if args.models == "fake" else None,
+            "frame_shapes": [list(frame.shape) for frame in frames],
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "torch": torch.__version__,
+            "opencv": cv2.__version__,
+            "torch_threads": torch.get_num_threads(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    """回傳 FPS 低於 baseline 超過 max_regression 比例的階段"""
+    regressions = []
+    for name, stats in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None or not old["fps"]:
+            continue
+        change = stats["fps"] / old["fps"] - 1
+        print(f"{name:<24} {old['fps']:9.1f} -> {stats['fps']:9.1f} /s ({change:+.1%})")
+        if change < -max_regression:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", choices=["fake", "real"], default="fake")
+    parser.add_argument("--images", nargs="+", default=["images/*.jpg"], help="glob patterns of input images")
+    parser.add_argument("--cameras", type=int, default=3, help="frames per tick")
+    parser.add_argument("--persons", type=int, default=1, help="persons per frame (fake models)")
+    parser.add_argument("--boxes", type=int, default=8, help="boxes per frame (fake models)")
+    parser.add_argument("--work", type=int, default=2, help="blur passes per input at imgsz (fake models)")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="previous --json output to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="allowed FPS drop per stage, e.g. 0.1 = 10%%")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression)
+        if regressions:
+            print(f"FPS regression: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,7 @@
-from .window import MainWindow
+def __getattr__(name):
+    # MainWindow 需要 Qt 視窗與 winsound，延後到真正使用時才載入，讓無視窗的 CLI 也能 import 此套件
+    if name == "MainWindow":
+        from .window import MainWindow
+
+        return MainWindow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
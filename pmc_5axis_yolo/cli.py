@@ -0,0 +1,72 @@
+"""
+無視窗的批次處理: 將圖片或影片 (.mp4) 送進姿態 + 物件偵測流程，輸出每張畫面的 Behavior 紀錄.
+
+用法:
+    python -m pmc_5axis_yolo.cli images/ captured_images/videos --workers 4 --annotate
+    python -m pmc_5axis_yolo.cli captured_images/videos --group-cameras --format parquet
+    python -m pmc_5axis_yolo.cli long_recording.mp4 --workers 8 --shards 8
+    python -m pmc_5axis_yolo.cli captured_images/videos --calibrate captured_images/videos/cam_1_calib.mp4
+"""
+
+import argparse
+import json
+import os
+import time
+
+from .settings import DEFAULT_OFFSETS, OBJECT_MODEL, POSE_MODEL
+from .tasks.batch import RecordWriter, collect_sources, run_sources
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m pmc_5axis_yolo.cli", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("inputs", nargs="+", help="image/video files or directories")
+    parser.add_argument("-o", "--output", default="outputs", help="output directory")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl", help="record format")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes, each loads its own models")
+    parser.add_argument("--annotate", action="store_true", help="write annotated images/videos")
+    parser.add_argument("--group-cameras", action="store_true", help="treat cam_<i>_<time>.mp4 files as one frame set")
+    parser.add_argument("--shards", type=int, default=1, help="split each video into N frame ranges across workers")
+    parser.add_argument("--min-shard-frames", type=int, default=300, help="minimum frames per shard")
+    parser.add_argument("--offsets", type=json.loads, default=None, help='JSON, e.g. \'{"stop_x": 52, ...}\'')
+    parser.add_argument("--calibrate", metavar="CLIP", help="estimate offsets from a clip of the control panel camera")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output, exist_ok=True)
+    offsets = DEFAULT_OFFSETS | (args.offsets or {})
+    if args.calibrate:
+        from .tasks import calibrate, iter_clip_frames, load_model
+
+        offsets = calibrate(offsets, iter_clip_frames(args.calibrate), load_model(POSE_MODEL), load_model(OBJECT_MODEL))
+
+    sources = collect_sources(args.inputs, args.group_cameras)
+    if not sources:
+        print("No images or videos found.")
+        return
+    print(f"Processing {len(sources)} sources with {args.workers} workers...")
+
+    writer = RecordWriter(os.path.join(args.output, f"behaviors.{args.format}"), args.format)
+    total_frames = 0
+    begin = time.perf_counter()
+    # 依來源順序回傳，紀錄會照來源順序寫入
+    reports = run_sources(
+        sources, offsets, args.workers, args.output, args.annotate, args.shards, args.min_shard_frames
+    )
+    for report in reports:
+        writer.write(report.records)
+        total_frames += report.frames
+        # seconds 為各程序處理時間的總和，這裡是每個程序的平均速度
+        fps = report.frames / report.seconds if report.seconds else 0
+        print(f"{report.source}: {report.frames} frames, {fps:.1f} FPS per worker")
+    writer.close()
+
+    elapsed = time.perf_counter() - begin
+    print(f"Done: {total_frames} frames in {elapsed:.1f} s ({total_frames / elapsed:.1f} FPS) -> {writer.path}")
+
+
+if __name__ == "__main__":
+    main()
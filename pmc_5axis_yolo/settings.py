@@ -1,6 +1,19 @@
 OBJECT_MODEL = "pmc5axis11n.pt"
 POSE_MODEL = "yolo11n-pose.pt"
+INFERENCE_BACKEND = "torch"  # "torch" | "onnxruntime" | "openvino" (先用 trainning/export.py 匯出)
+ORT_INTRA_OP_THREADS = 0  # 0: ONNX Runtime 預設 (實體核心數)
+ORT_INTER_OP_THREADS = 1
 PREDICT_VERBOSE = False
+WARMUP_SHAPE = (480, 640)  # 背景預熱推論的畫面大小 (height, width)，與攝影機解析度相同；None 不預熱
+PROFILING = False  # 記錄各階段耗時並顯示在狀態列，Ctrl+Shift+P 輸出 CSV
+PROFILE_WINDOW = 512  # 每個階段保留最近幾筆耗時
+POSE_CONF = 0.8
+OBJECT_CONF = 0.1
+MACHINE_ID = None  # 設定檔的機台名稱，None 使用電腦名稱
+PROFILE_DIR = "profiles"  # 偏移值、ROI 與攝影機順序的設定檔
+PROFILE_TOLERANCE = 30  # pixels，開啟攝影機時物件與設定檔的位置差超過此值就重新校正
+PROFILE_MIN_CONF = 0.5  # 儲存為比對基準的物件最低置信度
+OFFSET_UPDATE_INTERVAL = 33  # ms，拖曳偏移值滑桿時最多每個間隔套用一次
 DEFAULT_OFFSETS = {
     "stop_x": 52,
     "stop_y": 1,
@@ -8,8 +21,36 @@ DEFAULT_OFFSETS = {
     "feed_y": -10,
 }
 CAMERA_COUNT = 3  # MAX 5
+SOP_DIR = "texts"  # SOP_step.txt 與 steps_table.txt 所在的資料夾，子資料夾為其他 SOP
+SOP_NAME = "default"  # "default" 為 SOP_DIR 本身，否則為子資料夾名稱
+SOP_LANGUAGE = None  # 例如 "en": 優先讀取 SOP_step.en.txt、step1.en.txt
+SOP_RELOAD_INTERVAL = 1000  # ms，檢查 SOP 檔案是否被修改的間隔
+CALIBRATION_FRAMES = 60  # 偏移值校正使用的畫面數
+CALIBRATION_BATCH = 8  # 校正時姿態模型的批次大小
+CALIBRATION_REGION_STRIDE = 10  # 每幾張畫面重新偵測一次按鈕位置
+CALIBRATION_MIN_SAMPLES = 10  # 可用畫面少於此數時不更新偏移值
+ROI_ENABLED = False  # True 時物件偵測只在各攝影機的 ROI 內執行，ROI 由第一次可信的偵測結果自動設定
+ROI_TARGETS = {0: ("knife", "base"), 1: ("stop", "feed")}  # 各攝影機 ROI 需涵蓋的物件，未列出的攝影機偵測完整畫面
+ROI_PADDING = 0.25  # ROI 向外擴張的比例
+ROI_MIN_CONF = 0.5  # 設定 ROI 時物件的最低置信度
+ROI_MAX_IMGSZ = 640  # 裁切後推論輸入的最大邊長
+ROI_RESET_MISSES = 10  # ROI 內連續幾次偵測不到所有目標物件時清除 ROI，改回完整畫面偵測並重新設定
+TRACKING_ENABLED = False  # True 時物件偵測每 DETECT_INTERVAL 次推論執行一次，其餘以光流追蹤偵測框（結果為近似值）
+DETECT_INTERVAL = 5
+TRACK_MIN_CONFIDENCE = 0.6  # 框內仍被追蹤到的角點比例低於此值時立即重新偵測
+TRACK_POINTS = 20  # 每個框追蹤的角點數
+TRACK_MAX_FB_ERROR = 1.0  # pixels，前後向光流誤差上限
+SYNC_TOLERANCE_MS = 20  # 同一組畫面各攝影機擷取時間的最大差距
+SYNC_POLICY = "drop"  # "drop" | "interpolate": 超過容許誤差時丟棄或插值
+SYNC_BUFFER = 4  # 每台攝影機保留的畫面數，用於時間對齊
 BUTTON_THRESHOLD = 120
 LIE_THRESHOLD = 0.14  # normalized
 ARM_ANGLE_THRESHOLD = 150  # degrees
 ARM_STRETCH_THRESHOLD = 0.1  # normalized
 ARM_BEND_THRESHOLD = 0.05  # normalized
+SMOOTHING_MODE = "majority"  # "majority" | "decay" | "debounce" | "off"
+SMOOTHING_WINDOW = 9  # frames, majority vote
+SMOOTHING_DECAY = 0.7  # per frame, exponential decay
+DEBOUNCE_FRAMES = 3  # consecutive frames before a state changes
+SCHEDULER_MAX_LOAD = 0.8  # 推論執行緒最多佔用的時間比例
+SCHEDULER_MAX_STRIDE = 30  # 最多每幾張畫面推論一次
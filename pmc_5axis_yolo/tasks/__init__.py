@@ -1,2 +1,28 @@
-from .offsets import OffsetSlider, adj_offsets
+from .backends import InferenceModel, OnnxRuntimeModel, load_model
+from .engine import FrameResult, InferenceEngine
+from .loader import ModelLoader
+from .offsets import (
+    CalibrationResult,
+    OffsetSlider,
+    adj_offsets,
+    calibrate,
+    calibrate_offsets,
+    draw_offset_preview,
+    iter_clip_frames,
+)
 from .predict import Behavior, SafeState, predict_result, predict_safe
+from .profiles import (
+    Profile,
+    load_profile,
+    machine_id,
+    reference_points,
+    save_profile,
+    validate_profile,
+)
+from .roi import CameraRois
+from .scheduler import AdaptiveScheduler
+from .smoothing import BehaviorFilter
+from .sop import SopDocument, SopLibrary
+from .sop_machine import SopMachine, SopStatus, load_machine, replay
+from .tracking import DetectionTracker
+from .worker import InferencePipeline
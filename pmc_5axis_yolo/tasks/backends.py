@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import ast
+import os
+from typing import TYPE_CHECKING, Protocol
+
+import numpy as np
+from cv2.typing import MatLike
+
+from ..settings import INFERENCE_BACKEND, ORT_INTER_OP_THREADS, ORT_INTRA_OP_THREADS
+from ..utils import load_images
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+
+# torch 與 ultralytics 的 import 需要數秒，延後到真正載入模型時（ModelLoader 的背景執行緒）
+
+
+class InferenceModel(Protocol):
+    """predict_result、adj_offsets 與 MainWindow 需要的模型介面（與 ultralytics.YOLO 相同）"""
+
+    names: dict[int, str]
+
+    def predict(self, source, conf: float = 0.25, verbose: bool = False, **kwargs) -> list[Results]: ...
+
+
+class OnnxRuntimeModel:
+    """
+    以 ONNX Runtime 在 CPU 上執行 ultralytics 匯出的 ONNX 模型.
+
+    前處理 (letterbox) 與後處理 (NMS、座標還原) 沿用 ultralytics 的實作，
+    回傳的 Results 與 YOLO.predict 相同，可直接交給 predict_safe 與 extract_object_regions。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        intra_op_threads: int = ORT_INTRA_OP_THREADS,
+        inter_op_threads: int = ORT_INTER_OP_THREADS,
+    ):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("INFERENCE_BACKEND 'onnxruntime' requires: pip install onnxruntime") from e
+        from ultralytics.data.augment import LetterBox
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+        # ultralytics 匯出時會把類別名稱等資訊寫入 metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"])
+        self.task = metadata.get("task", "detect")
+        self.kpt_shape = ast.literal_eval(metadata["kpt_shape"]) if "kpt_shape" in metadata else None
+        imgsz = ast.literal_eval(metadata.get("imgsz", "[640, 640]"))
+        self.stride = int(metadata.get("stride", 32))
+        self.letterbox = LetterBox(imgsz, auto=False, stride=self.stride)
+        self._letterboxes = {}  # 其他輸入大小 (ROI) 的 LetterBox
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.dynamic_shape = not isinstance(model_input.shape[2], int)  # 以 dynamic=True 匯出時可使用較小的輸入
+
+    def preprocess(self, images: list[MatLike], imgsz: int | None = None) -> np.ndarray:
+        letterbox = self.letterbox
+        if imgsz is not None and self.dynamic_shape:
+            if imgsz not in self._letterboxes:
+                from ultralytics.data.augment import LetterBox
+
+                self._letterboxes[imgsz] = LetterBox((imgsz, imgsz), auto=False, stride=self.stride)
+            letterbox = self._letterboxes[imgsz]
+        batch = np.stack([letterbox(image=image) for image in images])
+        batch = batch[..., ::-1].transpose(0, 3, 1, 2)  # BGR to RGB, BHWC to BCHW
+        return np.ascontiguousarray(batch, dtype=np.float32) / 255
+
+    def predict(
+        self, source, conf: float = 0.25, verbose: bool = False, iou: float = 0.7, imgsz: int | None = None
+    ) -> list[Results]:
+        import torch
+        from ultralytics.engine.results import Results
+        from ultralytics.utils import ops
+
+        images = load_images(source)
+        batch = self.preprocess(images, imgsz)
+        if self.dynamic_batch:
+            output = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            output = np.concatenate([self.session.run(None, {self.input_name: x[None]})[0] for x in batch])
+        preds = ops.non_max_suppression(torch.from_numpy(output), conf, iou, nc=len(self.names))
+
+        results = []
+        for pred, image in zip(preds, images):
+            pred[:, :4] = ops.scale_boxes(batch.shape[2:], pred[:, :4], image.shape)
+            keypoints = None
+            if self.task == "pose":
+                keypoints = pred[:, 6:].view(len(pred), *self.kpt_shape)
+                keypoints = ops.scale_coords(batch.shape[2:], keypoints, image.shape)
+            results.append(Results(image, path="", names=self.names, boxes=pred[:, :6], keypoints=keypoints))
+        if verbose:
+            print(f"{len(images)} images, {sum(len(r.boxes) for r in results)} detections (onnxruntime)")
+        return results
+
+
+def exported_path(path: str, backend: str) -> str:
+    """由 .pt 檔名推得 ultralytics 匯出的檔名，例如 pmc5axis11n.onnx、pmc5axis11n_openvino_model/"""
+    stem, _ = os.path.splitext(path)
+    if backend == "onnxruntime":
+        return f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_openvino_model{os.sep}"
+    return path
+
+
+def load_model(path: str, backend: str = INFERENCE_BACKEND) -> InferenceModel:
+    """依照 settings.INFERENCE_BACKEND 載入模型"""
+    from ultralytics import YOLO
+
+    match backend:
+        case "torch":
+            return YOLO(path)
+        case "onnxruntime":
+            return OnnxRuntimeModel(exported_path(path, backend))
+        case "openvino":
+            # ultralytics 原生支援 OpenVINO IR 資料夾
+            return YOLO(exported_path(path, backend))
+        case _:
+            raise ValueError(f"Unknown inference backend: {backend}")
@@ -0,0 +1,336 @@
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from functools import partial
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from ..settings import OBJECT_MODEL, POSE_MODEL
+from .backends import load_model
+from .engine import InferenceEngine
+from .predict import Behavior
+from .smoothing import BehaviorFilter
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+VIDEO_EXTS = (".mp4",)
+CAMERA_FILE = re.compile(r"cam_(\d+)_(.+)\.mp4$")  # record_with_multiple_camera 的檔名
+
+
+@dataclass
+class Source:
+    """一個要重新處理的輸入：單張圖片，或一組同時錄製的影片（每台攝影機一個檔案）"""
+
+    name: str
+    paths: list[str]
+    kind: str  # "image" | "video"
+
+    def frame_count(self) -> int:
+        if self.kind == "image":
+            return 1
+        counts = []
+        for path in self.paths:
+            cap = cv2.VideoCapture(path)
+            counts.append(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+            cap.release()
+        return min(counts)
+
+    def fps(self) -> float:
+        if self.kind == "image":
+            return 0.0
+        cap = cv2.VideoCapture(self.paths[0])
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        return fps
+
+
+@dataclass
+class SourceReport:
+    source: str
+    records: list[dict] = field(default_factory=list)
+    behaviors: list[Behavior] = field(default_factory=list)  # 未平滑的結果，合併切段時重新平滑
+    frames: int = 0
+    seconds: float = 0.0
+    annotated: str | None = None  # 標註後的影片
+
+
+def collect_sources(inputs: list[str], group_cameras: bool = False) -> list[Source]:
+    """
+    收集圖片與影片.
+
+    group_cameras=True 時，同一次錄影的 cam_0_<time>.mp4、cam_1_<time>.mp4... 會合成一個多攝影機來源，
+    依攝影機編號排列，與 MainWindow 的攝影機順序相同。
+    """
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)))
+        else:
+            files.append(path)
+
+    sources = []
+    groups: dict[str, list[tuple[int, str]]] = {}
+    for path in files:
+        ext = os.path.splitext(path)[1].lower()
+        if ext in IMAGE_EXTS:
+            sources.append(Source(path, [path], "image"))
+        elif ext in VIDEO_EXTS:
+            match = CAMERA_FILE.search(os.path.basename(path))
+            if group_cameras and match:
+                groups.setdefault(match.group(2), []).append((int(match.group(1)), path))
+            else:
+                sources.append(Source(path, [path], "video"))
+
+    for recorded_at, cameras in sorted(groups.items()):
+        sources.append(Source(f"cam_*_{recorded_at}", [path for _, path in sorted(cameras)], "video"))
+    return sources
+
+
+def iter_frame_sets(source: Source, start: int = 0, stop: int | None = None):
+    """依序產生 (frame_index, timestamp, frames)；影片會直接跳到 start"""
+    if source.kind == "image":
+        frame = cv2.imread(source.paths[0])
+        if frame is not None:
+            yield 0, 0.0, [frame]
+        return
+
+    caps = [cv2.VideoCapture(path) for path in source.paths]
+    fps = caps[0].get(cv2.CAP_PROP_FPS) or 30.0
+    try:
+        if start:
+            for cap in caps:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        idx = start
+        while stop is None or idx < stop:
+            frames = []
+            for cap in caps:
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                frames.append(frame)
+            yield idx, idx / fps, frames
+            idx += 1
+    finally:
+        for cap in caps:
+            cap.release()
+
+
+def behavior_record(
+    source: str, frame: int, timestamp: float, behavior: Behavior, smoothed: Behavior | None = None
+) -> dict:
+    """每張畫面一筆扁平的紀錄，方便寫成 JSONL 或 Parquet"""
+    record = {"source": source, "frame": frame, "timestamp": round(timestamp, 4)}
+    for f in fields(Behavior):
+        record[f.name] = getattr(behavior, f.name).name
+    if smoothed is not None:
+        set_smoothed(record, smoothed)
+    return record
+
+
+def set_smoothed(record: dict, smoothed: Behavior):
+    for f in fields(Behavior):
+        record[f"smoothed_{f.name}"] = getattr(smoothed, f.name).name
+
+
+def annotated_path(source: Source, output_dir: str, part: int | None = None) -> str:
+    """標註影片的路徑；切段處理時每段加上起始畫面編號，合併後為不含編號的檔名"""
+    stem = os.path.splitext(os.path.basename(source.paths[0]))[0]
+    suffix = f"_part{part}" if part is not None else ""
+    return os.path.join(output_dir, f"{stem}{suffix}_annotated.mp4")
+
+
+def concat_videos(paths: list[str], output_path: str, remove: bool = True):
+    """依序串接切段的影片（大小與 FPS 相同），remove=True 時刪除切段檔案"""
+    writer = None
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        if writer is None:
+            size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"mp4v"), cap.get(cv2.CAP_PROP_FPS), size)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(frame)
+        cap.release()
+    if writer is not None:
+        writer.release()
+    if remove:
+        for path in paths:
+            os.remove(path)
+
+
+def combine_frames(images: list[MatLike]) -> MatLike:
+    """多攝影機的畫面縮放到相同高度後左右合併"""
+    if len(images) == 1:
+        return images[0]
+    height = min(image.shape[0] for image in images)
+    resized = [cv2.resize(image, (int(image.shape[1] * height / image.shape[0]), height)) for image in images]
+    return np.hstack(resized)
+
+
+class RecordWriter:
+    """將紀錄寫成 JSONL（串流寫入）或 Parquet（結束時寫入，需要 pyarrow）"""
+
+    def __init__(self, path: str, fmt: str = "jsonl"):
+        if fmt not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown record format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self._rows = []
+        self._file = open(path, "w", encoding="utf-8") if fmt == "jsonl" else None
+
+    def write(self, records: list[dict]):
+        if self._file is not None:
+            for record in records:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            self._rows.extend(records)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            return
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires: pip install pyarrow") from e
+        pq.write_table(pa.Table.from_pylist(self._rows), self.path)
+
+
+# 每個工作程序各自載入一份模型
+_engine: InferenceEngine | None = None
+
+
+def init_worker(threads: int = 0):
+    """threads > 0 時限制每個程序的 torch 執行緒數，避免多個程序互搶 CPU 核心"""
+    global _engine
+    if threads > 0:
+        import torch
+
+        torch.set_num_threads(threads)
+    # 離線評估要與逐張完整推論的結果一致，不使用 ROI 裁切與光流追蹤
+    _engine = InferenceEngine(load_model(POSE_MODEL), load_model(OBJECT_MODEL), use_roi=False, track=False)
+
+
+def get_engine() -> InferenceEngine:
+    if _engine is None:
+        init_worker()
+    return _engine
+
+
+def process_source(
+    source: Source,
+    offsets: dict,
+    output_dir: str | None = None,
+    annotate: bool = False,
+    start: int = 0,
+    stop: int | None = None,
+    smooth: bool = True,
+) -> SourceReport:
+    """處理一個來源的 [start, stop) 畫面；切段處理時 smooth=False，合併後再由 merge_reports 平滑"""
+    engine = get_engine()
+    engine.reset()  # ROI 與追蹤依各來源的畫面重新開始
+    behavior_filter = BehaviorFilter() if smooth and source.kind == "video" else None
+    report = SourceReport(source.name)
+    writer = None
+    begin = time.perf_counter()
+
+    for idx, timestamp, frames in iter_frame_sets(source, start, stop):
+        result = engine.process(frames, offsets, annotate=annotate)
+        smoothed = behavior_filter.update(result.behavior) if behavior_filter is not None else None
+        report.records.append(behavior_record(source.name, idx, timestamp, result.behavior, smoothed))
+        report.behaviors.append(result.behavior)
+        report.frames += 1
+
+        if annotate and output_dir is not None:
+            image = combine_frames(result.images)
+            stem = os.path.splitext(os.path.basename(source.paths[0]))[0]
+            if source.kind == "image":
+                cv2.imwrite(os.path.join(output_dir, f"{stem}_annotated.jpg"), image)
+            else:
+                if writer is None:
+                    # 切段處理的各段先寫成獨立的檔案，merge_reports 再依序串接
+                    part = start if start or stop is not None else None
+                    report.annotated = annotated_path(source, output_dir, part)
+                    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                    writer = cv2.VideoWriter(report.annotated, fourcc, source.fps(), (image.shape[1], image.shape[0]))
+                writer.write(image)
+
+    if writer is not None:
+        writer.release()
+    report.seconds = time.perf_counter() - begin
+    return report
+
+
+def split_frames(total: int, shards: int, min_frames: int = 300) -> list[tuple[int, int]]:
+    """將 [0, total) 切成最多 shards 段連續的畫面範圍，每段至少 min_frames 張"""
+    shards = max(1, min(shards, total // max(1, min_frames)))
+    bounds = np.linspace(0, total, shards + 1).astype(int).tolist()
+    return [(bounds[i], bounds[i + 1]) for i in range(shards)]
+
+
+def merge_reports(source: Source, reports: list[SourceReport]) -> SourceReport:
+    """
+    依畫面順序合併同一來源的切段結果.
+
+    平滑濾波器只有在依序處理時才正確，因此切段時只輸出原始結果，
+    合併後在這裡從頭重新平滑（每張畫面 O(1)），切段邊界的時間狀態因此與單一程序處理完全一致。
+    各段的標註影片也依序串接成一個檔案，與單一程序處理的輸出相同。
+    """
+    merged = SourceReport(source.name)
+    for report in reports:
+        merged.records.extend(report.records)
+        merged.behaviors.extend(report.behaviors)
+        merged.frames += report.frames
+        merged.seconds += report.seconds
+
+    if source.kind == "video":
+        behavior_filter = BehaviorFilter()
+        for record, behavior in zip(merged.records, merged.behaviors):
+            set_smoothed(record, behavior_filter.update(behavior))
+
+    parts = [report.annotated for report in reports if report.annotated is not None]
+    if parts:
+        merged.annotated = annotated_path(source, os.path.dirname(parts[0]))
+        concat_videos(parts, merged.annotated)
+    return merged
+
+
+def run_sources(
+    sources: list[Source],
+    offsets: dict,
+    workers: int = 1,
+    output_dir: str | None = None,
+    annotate: bool = False,
+    shards: int = 1,
+    min_shard_frames: int = 300,
+):
+    """
+    以程序池處理所有來源，依來源順序產生 SourceReport.
+
+    shards > 1 時，每支影片會切成可跳轉的畫面範圍分給不同程序（各自載入模型）處理，再依序合併。
+    """
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    tasks = []
+    for source in sources:
+        ranges = [(0, None)]
+        if source.kind == "video" and shards > 1:
+            ranges = split_frames(source.frame_count(), shards, min_shard_frames)
+            ranges[-1] = (ranges[-1][0], None)  # CAP_PROP_FRAME_COUNT 只是估計值，最後一段讀到影片結束
+        tasks.append((source, ranges))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(threads,)) as executor:
+        submit = partial(executor.submit, process_source, offsets=offsets, output_dir=output_dir, annotate=annotate)
+        futures = [
+            [submit(source, start=start, stop=stop, smooth=len(ranges) == 1) for start, stop in ranges]
+            for source, ranges in tasks
+        ]
+        for (source, _), source_futures in zip(tasks, futures):
+            reports = [future.result() for future in source_futures]
+            yield reports[0] if len(reports) == 1 else merge_reports(source, reports)
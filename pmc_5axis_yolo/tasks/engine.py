@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from cv2.typing import MatLike
+
+from ..settings import OBJECT_CONF, POSE_CONF, PREDICT_VERBOSE, ROI_ENABLED, TRACKING_ENABLED
+from ..utils import load_images, profiler
+from .backends import InferenceModel
+from .predict import Behavior, annotate_results, judge_results, predict_safe
+from .roi import CameraRois
+from .sop_machine import SopStatus
+from .tracking import DetectionTracker
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+
+
+@dataclass
+class FrameResult:
+    """一組畫面的推論結果"""
+
+    frames: list[MatLike]
+    images: list[MatLike]
+    behavior: Behavior
+    pose_results: list[Results]
+    object_results: list[Results]
+    smoothed: Behavior | None = None  # SOP 與警示使用的 Behavior，由 InferencePipeline 填入
+    sop: SopStatus | None = None  # 這組畫面之後的 SOP 狀態
+
+    def overlay(self, frames: list[MatLike]) -> list[MatLike]:
+        """把這次的推論結果畫在較新的畫面上"""
+        class_names = self.object_results[0].names if self.object_results else {}
+        return annotate_results(self.pose_results, self.object_results, class_names, frames)
+
+
+class InferenceEngine:
+    """
+    同時執行姿態模型與物件模型的推論引擎.
+
+    每個模型各自擁有一條工作執行緒（同一個模型不會被兩條執行緒同時呼叫），
+    所有攝影機畫面會合成一個批次送進模型，兩個模型的推論時間因此重疊而不是相加。
+    use_roi=True 時物件偵測只在各攝影機的 ROI 內以較小的輸入大小執行，結果對應回完整畫面；
+    track=True 時物件偵測只偶爾執行，其餘畫面以光流追蹤上一次的偵測框。
+    """
+
+    def __init__(
+        self,
+        pose_model: InferenceModel,
+        object_model: InferenceModel,
+        use_roi: bool = ROI_ENABLED,
+        track: bool = TRACKING_ENABLED,
+    ):
+        self.pose_model = pose_model
+        self.object_model = object_model
+        self.rois = CameraRois() if use_roi else None
+        self.tracker = DetectionTracker() if track else None
+        self._pose_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pose")
+        self._object_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="object")
+
+    def infer(self, image: str | MatLike | list[str | MatLike]) -> tuple[list[Results], list[Results]]:
+        """同時對所有畫面執行姿態估計與物件偵測"""
+        batch = load_images(image)
+        pose_future = self._pose_executor.submit(self._predict, "pose", self.pose_model, batch, POSE_CONF)
+        object_future = self._object_executor.submit(self._predict_objects, batch)
+        return pose_future.result(), object_future.result()
+
+    @staticmethod
+    def _predict(span: str, model: InferenceModel, batch: list[MatLike], conf: float) -> list[Results]:
+        with profiler.span(span):
+            return model.predict(batch, conf=conf, verbose=PREDICT_VERBOSE)
+
+    def _predict_objects(self, batch: list[MatLike]) -> list[Results]:
+        if self.tracker is None:
+            return self._detect_objects(batch)
+        with profiler.span("track"):
+            results = self.tracker.track(batch)
+        if results is None:
+            results = self._detect_objects(batch)
+            self.tracker.start(batch, results)
+        return results
+
+    def _detect_objects(self, batch: list[MatLike]) -> list[Results]:
+        if self.rois is None:
+            return self._predict("object", self.object_model, batch, OBJECT_CONF)
+
+        with profiler.span("object"):
+            results = [None] * len(batch)
+            rois, crops, imgsz = self.rois.crop(batch)
+            if crops:
+                cropped = self.object_model.predict(crops, conf=OBJECT_CONF, verbose=PREDICT_VERBOSE, imgsz=imgsz)
+                roi_results = self.rois.uncrop(rois, cropped, batch)
+                for idx, result in roi_results.items():
+                    results[idx] = result
+                self.rois.check(roi_results, len(batch))
+
+            # 沒有 ROI 的攝影機偵測完整畫面，並嘗試以結果設定 ROI
+            full = [idx for idx in range(len(batch)) if idx not in rois]
+            if full:
+                full_results = self.object_model.predict(
+                    [batch[idx] for idx in full], conf=OBJECT_CONF, verbose=PREDICT_VERBOSE
+                )
+                for idx, result in zip(full, full_results):
+                    results[idx] = result
+                self.rois.seed(dict(zip(full, full_results)), len(batch))
+            return results
+
+    def predict_result(
+        self, image: str | MatLike | list[str | MatLike], offsets: dict
+    ) -> tuple[list[MatLike], Behavior]:
+        """與 predict_result 相同的回傳格式 (frames, Behavior)"""
+        print("Predicting pose and objects...")
+        pose_results, object_results = self.infer(image)
+        return judge_results(pose_results, object_results, self.object_model.names, offsets)
+
+    def process(
+        self, image: str | MatLike | list[str | MatLike], offsets: dict, annotate: bool = True
+    ) -> FrameResult:
+        """推論、繪製並判斷安全行為，保留原始結果供之後的畫面重複使用；annotate=False 時不繪製"""
+        frames = load_images(image)
+        pose_results, object_results = self.infer(frames)
+        if annotate:
+            images, behavior = judge_results(pose_results, object_results, self.object_model.names, offsets)
+        else:
+            with profiler.span("predict_safe"):
+                images, behavior = frames, predict_safe(pose_results, object_results, offsets)
+        return FrameResult(frames, images, behavior, pose_results, object_results)
+
+    def reset(self):
+        """切換輸入來源時清除 ROI 並重新偵測"""
+        if self.rois is not None:
+            self.rois.reset()
+        if self.tracker is not None:
+            self.tracker.invalidate()
+
+    def close(self):
+        self._pose_executor.shutdown(wait=True)
+        self._object_executor.shutdown(wait=True)
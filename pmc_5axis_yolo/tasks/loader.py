@@ -0,0 +1,68 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+from PySide6.QtCore import QObject, Signal
+
+from ..settings import CAMERA_COUNT, OBJECT_CONF, POSE_CONF, WARMUP_SHAPE
+from .backends import InferenceModel, load_model
+
+
+class ModelLoader(QObject):
+    """
+    在背景執行緒載入並預熱姿態與物件模型.
+
+    torch / ultralytics 的 import、模型載入與第一次推論（配置記憶體、選擇運算核心）都在背景完成，
+    視窗可以立即顯示；需要模型的操作呼叫 wait() 或以 future 取得 (pose_model, object_model)。
+    """
+
+    progress = Signal(int, str)  # 百分比, 目前的步驟
+    loaded = Signal()
+    failed = Signal(str)
+
+    def __init__(self, pose_path: str, object_path: str, warmup_shape: tuple[int, int] | None = WARMUP_SHAPE):
+        super().__init__()
+        self.pose_path = pose_path
+        self.object_path = object_path
+        self.warmup_shape = warmup_shape
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+        self.future: Future[tuple[InferenceModel, InferenceModel]] | None = None
+
+    def start(self) -> Future:
+        if self.future is None:
+            self.future = self._executor.submit(self._load)
+        return self.future
+
+    @property
+    def ready(self) -> bool:
+        return self.future is not None and self.future.done() and self.future.exception() is None
+
+    def wait(self) -> tuple[InferenceModel, InferenceModel]:
+        """阻塞直到模型載入完成；載入失敗時拋出原本的例外"""
+        return self.start().result()
+
+    def _load(self) -> tuple[InferenceModel, InferenceModel]:
+        try:
+            self.progress.emit(5, "Importing torch / ultralytics...")
+            import ultralytics  # noqa: F401 第一次 import 需要數秒，在背景執行
+
+            self.progress.emit(20, "Loading pose model...")
+            pose_model = load_model(self.pose_path)
+            self.progress.emit(45, "Loading object model...")
+            object_model = load_model(self.object_path)
+
+            if self.warmup_shape is not None:
+                # 與攝影機模式相同的批次大小與解析度
+                batch = [np.zeros((*self.warmup_shape, 3), dtype=np.uint8)] * CAMERA_COUNT
+                self.progress.emit(70, "Warming up pose model...")
+                pose_model.predict(batch, conf=POSE_CONF, verbose=False)
+                self.progress.emit(85, "Warming up object model...")
+                object_model.predict(batch, conf=OBJECT_CONF, verbose=False)
+        except Exception as e:
+            self.failed.emit(str(e))
+            raise
+        self.progress.emit(100, "Models ready")
+        self.loaded.emit()
+        return pose_model, object_model
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
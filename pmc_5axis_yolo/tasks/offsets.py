@@ -1,11 +1,31 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import cv2
+import numpy as np
 from cv2.typing import MatLike
-from PySide6.QtCore import Signal
+from PySide6.QtCore import QTimer, Signal
 from PySide6.QtWidgets import QDialog
-from ultralytics import YOLO
 
-from ..settings import DEFAULT_OFFSETS, PREDICT_VERBOSE
+from ..settings import (
+    CALIBRATION_BATCH,
+    CALIBRATION_FRAMES,
+    CALIBRATION_MIN_SAMPLES,
+    CALIBRATION_REGION_STRIDE,
+    DEFAULT_OFFSETS,
+    OFFSET_UPDATE_INTERVAL,
+    PREDICT_VERBOSE,
+)
 from ..ui.offset_slider_ui import Ui_Dialog
-from ..utils import extract_object_regions
+from ..utils import Region, extract_object_regions
+from .backends import InferenceModel
+from .predict import keypoints_to_numpy
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
 
 
 class OffsetSlider(QDialog, Ui_Dialog):
@@ -23,22 +43,25 @@ class OffsetSlider(QDialog, Ui_Dialog):
         self.initial_feed_x = initial_feed_x
         self.initial_feed_y = initial_feed_y
 
-        # 滑桿預設
+        # 滑桿預設（校正結果可能是小數）
         self.Stop_X_Slider.setRange(-250, 250)
-        self.Stop_X_Slider.setValue(initial_stop_x)
+        self.Stop_X_Slider.setValue(round(initial_stop_x))
         self.Stop_Y_Slider.setRange(-250, 250)
-        self.Stop_Y_Slider.setValue(initial_stop_y)
+        self.Stop_Y_Slider.setValue(round(initial_stop_y))
         self.Feed_X_Slider.setRange(-250, 250)
-        self.Feed_X_Slider.setValue(initial_feed_x)
+        self.Feed_X_Slider.setValue(round(initial_feed_x))
         self.Feed_Y_Slider.setRange(-250, 250)
-        self.Feed_Y_Slider.setValue(initial_feed_y)
-        self.update_offsets()
+        self.Feed_Y_Slider.setValue(round(initial_feed_y))
+        self.update_labels()
+        self.emit_offsets()
 
-        # 改變滑桿訊號(待降低重複性)
-        self.Stop_X_Slider.valueChanged.connect(self.update_offsets)
-        self.Stop_Y_Slider.valueChanged.connect(self.update_offsets)
-        self.Feed_X_Slider.valueChanged.connect(self.update_offsets)
-        self.Feed_Y_Slider.valueChanged.connect(self.update_offsets)
+        # 拖曳滑桿時標籤立即更新，offset_changed 每個間隔最多送出一次（只送最新的值）
+        self._emit_timer = QTimer(self)
+        self._emit_timer.setSingleShot(True)
+        self._emit_timer.setInterval(OFFSET_UPDATE_INTERVAL)
+        self._emit_timer.timeout.connect(self.emit_offsets)
+        for slider in (self.Stop_X_Slider, self.Stop_Y_Slider, self.Feed_X_Slider, self.Feed_Y_Slider):
+            slider.valueChanged.connect(self.update_offsets)
 
         # 按鈕改變滑桿
         self.Stop_X_Plusbutton.clicked.connect(
@@ -66,7 +89,7 @@ class OffsetSlider(QDialog, Ui_Dialog):
             lambda: self.adjust_slider(self.Feed_Y_Slider, -1)
         )
 
-        self.Offset_Slider_Button.accepted.connect(self.accept)
+        self.Offset_Slider_Button.accepted.connect(self.on_accept)
         self.Offset_Slider_Button.rejected.connect(self.cancel)
         self.Button_Offset_Picture.clicked.connect(self.PictureSetCall)
 
@@ -77,20 +100,35 @@ class OffsetSlider(QDialog, Ui_Dialog):
         slider.setValue(new_value)
 
     def update_offsets(self):
-        stop_x = self.Stop_X_Slider.value()
-        stop_y = self.Stop_Y_Slider.value()
-        feed_x = self.Feed_X_Slider.value()
-        feed_y = self.Feed_Y_Slider.value()
-        self.Stop_X_Label.setText(f"Stop_X: {stop_x}")
-        self.Stop_Y_Label.setText(f"Stop_Y: {stop_y}")
-        self.Feed_X_Label.setText(f"Feed_X: {feed_x}")
-        self.Feed_Y_Label.setText(f"Feed_Y: {feed_y}")
-        self.offset_changed.emit(stop_x, stop_y, feed_x, feed_y)
+        self.update_labels()
+        if not self._emit_timer.isActive():
+            self._emit_timer.start()
+
+    def update_labels(self):
+        self.Stop_X_Label.setText(f"Stop_X: {self.Stop_X_Slider.value()}")
+        self.Stop_Y_Label.setText(f"Stop_Y: {self.Stop_Y_Slider.value()}")
+        self.Feed_X_Label.setText(f"Feed_X: {self.Feed_X_Slider.value()}")
+        self.Feed_Y_Label.setText(f"Feed_Y: {self.Feed_Y_Slider.value()}")
+
+    def emit_offsets(self):
+        self.offset_changed.emit(
+            self.Stop_X_Slider.value(),
+            self.Stop_Y_Slider.value(),
+            self.Feed_X_Slider.value(),
+            self.Feed_Y_Slider.value(),
+        )
+
+    def on_accept(self):
+        # 送出尚未送出的最新值
+        self._emit_timer.stop()
+        self.emit_offsets()
+        self.accept()
 
     def PictureSetCall(self):
         self.PictureSetCalled.emit()
 
     def cancel(self):
+        self._emit_timer.stop()
         self.cancel_signal.emit(
             self.initial_stop_x,
             self.initial_stop_y,
@@ -100,12 +138,26 @@ class OffsetSlider(QDialog, Ui_Dialog):
         self.reject()
 
 
+def draw_offset_preview(image: MatLike, pose_result: Results, offsets: dict) -> MatLike:
+    """在畫面上標出每個人的手腕加上偏移值後的位置（與 predict_safe 判斷按鈕時使用的點相同）"""
+    keypoints = keypoints_to_numpy(pose_result.keypoints)
+    for person in keypoints:
+        for wrist, prefix, color in ((person[9], "stop", (0, 0, 255)), (person[10], "feed", (0, 255, 0))):
+            if not wrist.any():
+                continue
+            start = (int(wrist[0]), int(wrist[1]))
+            end = (int(wrist[0] + offsets[f"{prefix}_x"]), int(wrist[1] + offsets[f"{prefix}_y"]))
+            cv2.line(image, start, end, color, 1)
+            cv2.circle(image, end, 6, color, 2)
+    return image
+
+
 def adj_offsets(
     to_adj: bool,
     offsets: dict,
     image: str | MatLike,
-    pose_model: YOLO,
-    object_model: YOLO,
+    pose_model: InferenceModel,
+    object_model: InferenceModel,
 ) -> dict:  # similar to test_hand_on_button
     old_offsets = offsets.copy()  # save old offsets
 
@@ -151,6 +203,144 @@ def adj_offsets(
     return offsets
 
 
+@dataclass
+class CalibrationResult:
+    """多張畫面校正的結果，ci 為各偏移值 95% 信賴區間的半寬 (pixels)"""
+
+    offsets: dict
+    ci: dict = field(default_factory=dict)
+    samples: int = 0  # 採用的畫面數
+    rejected: int = 0  # 缺少按鈕或手腕的畫面數
+    outliers: int = 0  # 被 MAD 排除的畫面數
+
+    def __str__(self) -> str:
+        values = " ".join(f"[{key}: {self.offsets[key]:.1f} ± {self.ci[key]:.1f}]" for key in self.offsets)
+        return f"{values} ({self.samples} frames, {self.rejected} rejected, {self.outliers} outliers)"
+
+
+def robust_estimate(values: np.ndarray, threshold: float = 3.0) -> tuple[float, float, np.ndarray]:
+    """
+    以中位數與 MAD 排除離群值後估計中心值.
+
+    Returns:
+        tuple: (內群的中位數, 95% 信賴區間半寬, 內群遮罩)。
+    """
+    median = np.median(values)
+    sigma = 1.4826 * np.median(np.abs(values - median))  # MAD 換算為常態分布的標準差
+    inliers = np.abs(values - median) <= threshold * sigma if sigma > 0 else np.ones(len(values), dtype=bool)
+    kept = values[inliers]
+    spread = kept.std(ddof=1) if len(kept) > 1 else 0.0
+    # 中位數的標準誤約為平均數的 1.2533 倍
+    return float(np.median(kept)), float(1.96 * 1.2533 * spread / np.sqrt(len(kept))), inliers
+
+
+def iter_clip_frames(path: str, max_frames: int = CALIBRATION_FRAMES) -> Iterable[MatLike]:
+    """從影片中平均取出最多 max_frames 張畫面"""
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, total // max_frames) if total > 0 else 1
+    try:
+        idx = 0
+        count = 0
+        while count < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if idx % step == 0:
+                yield frame
+                count += 1
+            idx += 1
+    finally:
+        cap.release()
+
+
+def calibrate_offsets(
+    frames: Iterable[MatLike],
+    pose_model: InferenceModel,
+    object_model: InferenceModel,
+    batch_size: int = CALIBRATION_BATCH,
+    region_stride: int = CALIBRATION_REGION_STRIDE,
+) -> CalibrationResult | None:
+    """
+    以多張畫面估計手腕到按鈕中心的偏移值.
+
+    姿態模型以批次推論每張畫面；按鈕固定不動，物件偵測每 region_stride 張畫面才執行一次，
+    其間的畫面沿用最近一次的按鈕範圍，沒有偵測到任一按鈕的畫面不採用。
+    每個偏移值以中位數與 MAD 排除離群值，並回傳 95% 信賴區間。
+    """
+    stop_deltas, feed_deltas = [], []
+    rejected = 0
+    regions: dict[str, Region | None] = {"stop": None, "feed": None}
+    index = 0
+
+    def run_batch(batch: list[MatLike]):
+        nonlocal rejected, regions, index
+        pose_results = pose_model.predict(batch, conf=0.4, verbose=PREDICT_VERBOSE)
+        detect_at = [i for i in range(len(batch)) if (index + i) % region_stride == 0]
+        object_results = {}
+        if detect_at:
+            detected = object_model.predict([batch[i] for i in detect_at], conf=0.3, verbose=PREDICT_VERBOSE)
+            object_results = dict(zip(detect_at, detected))
+        for i, pose_result in enumerate(pose_results):
+            if i in object_results:
+                regions = extract_object_regions(object_results[i], ["stop", "feed"])
+            keypoints = keypoints_to_numpy(pose_result.keypoints)
+            if regions["stop"] is None or regions["feed"] is None or not len(keypoints):
+                rejected += 1
+                continue
+            # 與 adj_offsets 相同: 9 號關鍵點對 Stop，10 號關鍵點對 Feed；未偵測到的關鍵點座標為 0
+            left_hand, right_hand = keypoints[0, 9], keypoints[0, 10]
+            if not left_hand.any() or not right_hand.any():
+                rejected += 1
+                continue
+            stop, feed = regions["stop"], regions["feed"]
+            stop_deltas.append(
+                ((stop.x_min + stop.x_max) / 2 - left_hand[0], (stop.y_min + stop.y_max) / 2 - left_hand[1])
+            )
+            feed_deltas.append(
+                ((feed.x_min + feed.x_max) / 2 - right_hand[0], (feed.y_min + feed.y_max) / 2 - right_hand[1])
+            )
+        index += len(batch)
+
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            run_batch(batch)
+            batch = []
+    if batch:
+        run_batch(batch)
+
+    if not stop_deltas:
+        return None
+    result = CalibrationResult({}, samples=len(stop_deltas), rejected=rejected)
+    outliers = np.zeros(len(stop_deltas), dtype=bool)
+    for name, deltas in (("stop", np.array(stop_deltas)), ("feed", np.array(feed_deltas))):
+        for axis, key in enumerate((f"{name}_x", f"{name}_y")):
+            result.offsets[key], result.ci[key], inliers = robust_estimate(deltas[:, axis])
+            outliers |= ~inliers
+    result.outliers = int(outliers.sum())
+    return result
+
+
+def calibrate(
+    offsets: dict,
+    frames: Iterable[MatLike],
+    pose_model: InferenceModel,
+    object_model: InferenceModel,
+    min_samples: int = CALIBRATION_MIN_SAMPLES,
+) -> dict:
+    """以多張畫面校正偏移值；可用的畫面不足 min_samples 張時保留原本的偏移值"""
+    print("Calibrating offsets...")
+    result = calibrate_offsets(frames, pose_model, object_model)
+    if result is None or result.samples < min_samples:
+        samples = 0 if result is None else result.samples
+        print(f"Calibration failed: only {samples} usable frames (need {min_samples}). Using previous offsets.")
+        return offsets
+    print(f"Calibrated offsets: {result}")
+    return result.offsets
+
+
 if __name__ == "__main__":
     import sys
 
@@ -1,12 +1,12 @@
+from __future__ import annotations
+
 # import time
-from dataclasses import dataclass, fields
+from dataclasses import dataclass
 from enum import Enum
+from typing import TYPE_CHECKING
 
-import cv2
+import numpy as np
 from cv2.typing import MatLike
-from torch import Tensor
-from ultralytics import YOLO
-from ultralytics.engine.results import Results
 
 from ..settings import (
     ARM_ANGLE_THRESHOLD,
@@ -14,14 +14,18 @@ from ..settings import (
     ARM_STRETCH_THRESHOLD,
     BUTTON_THRESHOLD,
     LIE_THRESHOLD,
-    PREDICT_VERBOSE,
 )
 from ..utils import (
-    calculate_angle,
-    calculate_distance,
+    Region,
     extract_object_regions,
-    generate_colors,
+    get_renderer,
+    profiler,
 )
+from .backends import InferenceModel
+
+if TYPE_CHECKING:
+    from torch import Tensor
+    from ultralytics.engine.results import Keypoints, Results
 
 
 class SafeState(Enum):
@@ -46,120 +50,145 @@ class Behavior:
     human_pose: PoseState = PoseState.UNKNOWN
 
 
-def classify_pose(keypoints: Tensor) -> PoseState:
-    left_shoulder = keypoints[5].tolist()
-    right_shoulder = keypoints[6].tolist()
-    left_elbow = keypoints[7].tolist()
-    right_elbow = keypoints[8].tolist()
-    left_wrist = keypoints[9].tolist()
-    right_wrist = keypoints[10].tolist()
-    left_hip = keypoints[11].tolist()
-    right_hip = keypoints[12].tolist()
-    left_knee = keypoints[13].tolist()
-    right_knee = keypoints[14].tolist()
+POSE_ORDER = [PoseState.LIE, PoseState.ARM_STRETCH, PoseState.ARM_BEND, PoseState.STAND, PoseState.UNKNOWN]
+
+
+def keypoints_to_numpy(keypoints: Keypoints | None, normalized: bool = False) -> np.ndarray:
+    """取出所有人的關鍵點 (N_persons, 17, 2)；沒有偵測到人時 N_persons 為 0"""
+    if keypoints is None:
+        return np.zeros((0, 17, 2), dtype=np.float32)
+    xy = keypoints.xyn if normalized else keypoints.xy
+    xy = xy.cpu().numpy() if hasattr(xy, "cpu") else np.asarray(xy)
+    return xy.reshape(-1, 17, 2)
+
+
+def _average_y(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # 兩點都有偵測到取平均，否則取有偵測到的那一點 (未偵測到的關鍵點座標為 0)
+    return np.where((a != 0) & (b != 0), (a + b) / 2, np.where(a != 0, a, b))
+
+
+def _angles(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """每個人的夾角 ABC (degrees)，a/b/c 為 (N, 2)"""
+    ba = a - b
+    bc = c - b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cosine = (ba * bc).sum(axis=1) / (np.linalg.norm(ba, axis=1) * np.linalg.norm(bc, axis=1))
+        return np.degrees(np.arccos(cosine))
+
+
+def classify_poses(keypoints: np.ndarray) -> list[PoseState]:
+    """一次判斷所有人的姿態，keypoints 為正規化座標 (N_persons, 17, 2)"""
+    if not len(keypoints):
+        return []
+    y = keypoints[..., 1]
 
     # 計算平均肩膀、臀部、膝蓋的 y 座標
-    avg_hip_y = (
-        (left_hip[1] + right_hip[1]) / 2 if left_hip[1] != 0 and right_hip[1] != 0 else left_hip[1] or right_hip[1]
-    )
-    avg_knee_y = (
-        (left_knee[1] + right_knee[1]) / 2
-        if left_knee[1] != 0 and right_knee[1] != 0
-        else left_knee[1] or right_knee[1]
-    )
-    avg_shoulder_y = (
-        (left_shoulder[1] + right_shoulder[1]) / 2
-        if left_shoulder[1] != 0 and right_shoulder[1] != 0
-        else left_shoulder[1] or right_shoulder[1]
-    )
+    avg_shoulder_y = _average_y(y[:, 5], y[:, 6])
+    avg_hip_y = _average_y(y[:, 11], y[:, 12])
+    avg_knee_y = _average_y(y[:, 13], y[:, 14])
+    left_wrist_y = y[:, 9]
+    right_wrist_y = y[:, 10]
 
     # 左右手伸直判斷
-    left_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-    # left_distance = calculate_distance(left_wrist, left_shoulder)
-    right_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-    # right_distance = calculate_distance(right_wrist, right_shoulder)
+    left_angle = _angles(keypoints[:, 5], keypoints[:, 7], keypoints[:, 9])
+    right_angle = _angles(keypoints[:, 6], keypoints[:, 8], keypoints[:, 10])
+
+    def wrist_raised(wrist_y: np.ndarray, threshold: float) -> np.ndarray:
+        return (wrist_y != 0) & ((avg_hip_y == 0) | (avg_hip_y - wrist_y > threshold))
+
+    has_hip = avg_hip_y != 0
+    has_shoulder = avg_shoulder_y != 0
+    has_knee = avg_knee_y != 0
 
     # 判斷蹲下或躺下
-    if (avg_hip_y != 0 and avg_shoulder_y != 0 and avg_hip_y - avg_shoulder_y < LIE_THRESHOLD) or (
-        avg_knee_y != 0 and avg_hip_y != 0 and avg_knee_y - avg_hip_y < LIE_THRESHOLD
-    ):
-        return PoseState.LIE
+    lie = (has_hip & has_shoulder & (avg_hip_y - avg_shoulder_y < LIE_THRESHOLD)) | (
+        has_knee & has_hip & (avg_knee_y - avg_hip_y < LIE_THRESHOLD)
+    )
     # 判斷手臂伸展或彎曲
-    if (left_angle > ARM_ANGLE_THRESHOLD or right_angle > ARM_ANGLE_THRESHOLD) and (
-        (left_wrist[1] != 0 and (avg_hip_y == 0 or avg_hip_y - left_wrist[1] > ARM_STRETCH_THRESHOLD))
-        or (right_wrist[1] != 0 and (avg_hip_y == 0 or avg_hip_y - right_wrist[1] > ARM_STRETCH_THRESHOLD))
-    ):
-        return PoseState.ARM_STRETCH
-    elif (left_wrist[1] != 0 and (avg_hip_y == 0 or avg_hip_y - left_wrist[1] > ARM_BEND_THRESHOLD)) or (
-        right_wrist[1] != 0 and (avg_hip_y == 0 or avg_hip_y - right_wrist[1] > ARM_BEND_THRESHOLD)
-    ):
-        return PoseState.ARM_BEND
+    arm_stretch = ((left_angle > ARM_ANGLE_THRESHOLD) | (right_angle > ARM_ANGLE_THRESHOLD)) & (
+        wrist_raised(left_wrist_y, ARM_STRETCH_THRESHOLD) | wrist_raised(right_wrist_y, ARM_STRETCH_THRESHOLD)
+    )
+    arm_bend = wrist_raised(left_wrist_y, ARM_BEND_THRESHOLD) | wrist_raised(right_wrist_y, ARM_BEND_THRESHOLD)
     # 判斷站立
-    if (avg_hip_y != 0 and avg_shoulder_y != 0 and avg_hip_y > avg_shoulder_y) and (
-        avg_knee_y != 0 and avg_hip_y != 0 and avg_knee_y > avg_hip_y
-    ):
-        return PoseState.STAND
+    stand = (has_hip & has_shoulder & (avg_hip_y > avg_shoulder_y)) & (has_knee & has_hip & (avg_knee_y > avg_hip_y))
 
-    return PoseState.UNKNOWN
+    # 依序: 躺下 > 手臂伸展 > 手臂彎曲 > 站立 > 未知
+    codes = np.select([lie, arm_stretch, arm_bend, stand], [0, 1, 2, 3], default=4)
+    return [POSE_ORDER[code] for code in codes.tolist()]
 
 
-# 測試安全行為 (假設畫面中只有一個人)
-def predict_safe(pose_results: list[Results], object_results: list[Results], offsets: dict) -> Behavior:
-    # 初始化行為
+def classify_pose(keypoints: Tensor) -> PoseState:
+    """單人版本的 classify_poses，keypoints 為正規化座標 (17, 2)"""
+    keypoints = keypoints.cpu().numpy() if hasattr(keypoints, "cpu") else np.asarray(keypoints)
+    return classify_poses(keypoints.reshape(1, 17, 2))[0]
+
+
+def hands_on_region(hands: np.ndarray, offset_x: float, offset_y: float, region: Region | None) -> np.ndarray:
+    """
+    判斷每個人的手 (N, 2) 加上偏移後是否在按鈕範圍內.
+
+    回傳每個人的 SafeState.value；沒有按鈕或沒有偵測到手時為 UNDETECTED。
+    """
+    states = np.full(len(hands), SafeState.UNDETECTED.value)
+    if region is None or not len(hands):
+        return states
+    detected = hands.sum(axis=1) != 0
+    x = hands[:, 0] + offset_x
+    y = hands[:, 1] + offset_y
+    inside = (
+        (region.x_min - BUTTON_THRESHOLD <= x)
+        & (x <= region.x_max + BUTTON_THRESHOLD)
+        & (region.y_min - BUTTON_THRESHOLD <= y)
+        & (y <= region.y_max + BUTTON_THRESHOLD)
+    )
+    states[detected] = np.where(inside[detected], SafeState.YES.value, SafeState.NO.value)
+    return states
+
+
+def aggregate_safe(states: np.ndarray) -> SafeState:
+    """任何一人為 YES 即為 YES；否則有人為 NO 即為 NO"""
+    if (states == SafeState.YES.value).any():
+        return SafeState.YES
+    if (states == SafeState.NO.value).any():
+        return SafeState.NO
+    return SafeState.UNDETECTED
+
+
+# 測試安全行為 (畫面中所有人)
+def predict_safe_persons(
+    pose_results: list[Results], object_results: list[Results], offsets: dict
+) -> tuple[Behavior, list[Behavior]]:
+    """
+    判斷所有人的安全行為.
+
+    Returns:
+        tuple[Behavior, list[Behavior]]: 整體行為，以及每個人（依姿態模型的置信度排序）的行為。
+        多台攝影機時姿態與按鈕來自不同攝影機，同一索引不是同一個人，因此只有單一攝影機時回傳每個人的行為，
+        否則為空列表。
+    """
     behavior = Behavior()
+    poses: list[PoseState] = []
+    stop_states = feed_states = np.zeros(0, dtype=int)
     single = len(pose_results) == 1 or len(object_results) == 1
     # 0號機處理人體姿態，1號機處理人體上半身及控制器，2號機處理底座及刀具
     for idx, (pose_result, object_result) in enumerate(zip(pose_results, object_results)):
-        # 獲取關鍵點 索引為: 9 是右手腕，10 是左手腕（根據 COCO 的姿態標註）
-        keypoints = pose_result.keypoints
-
-        # 取得右手與左手的座標 (x, y)
-        if keypoints.xy[0].numel() == 0:  # 沒有偵測到人
-            person = False
-        else:
-            person = True
-            left_hand = keypoints.xy[0][9].tolist()  # (x, y) of left hand
-            right_hand = keypoints.xy[0][10].tolist()  # (x, y) of right hand
+        # 所有人的關鍵點 索引為: 9 是右手腕，10 是左手腕（根據 COCO 的姿態標註）
+        keypoints = keypoints_to_numpy(pose_result.keypoints)
 
         # 提取 stop、feed、knife 和 base 的範圍
         regions = extract_object_regions(object_result, ["stop", "feed", "knife", "base"])
 
         if idx == 2 or single:
-            # 判斷人的姿態
-            if person:
-                behavior.human_pose = classify_pose(keypoints.xyn[0])
+            # 判斷每個人的姿態
+            poses = classify_poses(keypoints_to_numpy(pose_result.keypoints, normalized=True))
         if idx == 1 or single:
-            # 判斷左手是否在 Stop 按鈕上
-            if regions["stop"] and person:
-                if sum(left_hand) != 0:  # 有偵測到左手
-                    left_hand_x = left_hand[0] + offsets.get("stop_x", 0)
-                    left_hand_y = left_hand[1] + offsets.get("stop_y", 0)
-                    behavior.is_hand_on_stop = (
-                        SafeState.YES
-                        if regions["stop"].x_min - BUTTON_THRESHOLD
-                        <= left_hand_x
-                        <= regions["stop"].x_max + BUTTON_THRESHOLD
-                        and regions["stop"].y_min - BUTTON_THRESHOLD
-                        <= left_hand_y
-                        <= regions["stop"].y_max + BUTTON_THRESHOLD
-                        else SafeState.NO
-                    )
-
-            # 判斷右手是否在 Feed 按鈕上
-            if regions["feed"] and person:
-                if sum(right_hand) != 0:  # 有偵測到右手
-                    right_hand_x = right_hand[0] + offsets.get("feed_x", 0)
-                    right_hand_y = right_hand[1] + offsets.get("feed_y", 0)
-                    behavior.is_hand_on_feed = (
-                        SafeState.YES
-                        if regions["feed"].x_min - BUTTON_THRESHOLD
-                        <= right_hand_x
-                        <= regions["feed"].x_max + BUTTON_THRESHOLD
-                        and regions["feed"].y_min - BUTTON_THRESHOLD
-                        <= right_hand_y
-                        <= regions["feed"].y_max + BUTTON_THRESHOLD
-                        else SafeState.NO
-                    )
+            # 判斷左手是否在 Stop 按鈕上、右手是否在 Feed 按鈕上
+            stop_states = hands_on_region(
+                keypoints[:, 9], offsets.get("stop_x", 0), offsets.get("stop_y", 0), regions["stop"]
+            )
+            feed_states = hands_on_region(
+                keypoints[:, 10], offsets.get("feed_x", 0), offsets.get("feed_y", 0), regions["feed"]
+            )
         if idx == 0 or single:
             # 判斷 Knife 是否碰到 Base
             if regions["knife"] and regions["base"]:
@@ -173,143 +202,90 @@ def predict_safe(pose_results: list[Results], object_results: list[Results], off
                     else SafeState.NO
                 )
 
-    return behavior
+    behavior.is_hand_on_stop = aggregate_safe(stop_states)
+    behavior.is_hand_on_feed = aggregate_safe(feed_states)
+    # 取置信度最高且姿態可判斷的人
+    behavior.human_pose = next((pose for pose in poses if pose != PoseState.UNKNOWN), PoseState.UNKNOWN)
+
+    persons = []
+    if not single:
+        return behavior, persons
+    for i in range(max(len(poses), len(stop_states))):
+        persons.append(
+            Behavior(
+                is_hand_on_stop=SafeState(stop_states[i]) if i < len(stop_states) else SafeState.UNDETECTED,
+                is_hand_on_feed=SafeState(feed_states[i]) if i < len(feed_states) else SafeState.UNDETECTED,
+                is_knife_base_collided=behavior.is_knife_base_collided,
+                human_pose=poses[i] if i < len(poses) else PoseState.UNKNOWN,
+            )
+        )
+
+    return behavior, persons
+
+
+def predict_safe(pose_results: list[Results], object_results: list[Results], offsets: dict) -> Behavior:
+    return predict_safe_persons(pose_results, object_results, offsets)[0]
 
 
-# 測試單張影像
 def predict_result(
-    image: str | MatLike | list, pose_model: YOLO, object_model: YOLO, offsets: dict
+    image: str | MatLike | list, pose_model: InferenceModel, object_model: InferenceModel, offsets: dict
 ) -> tuple[list[MatLike], Behavior]:
-    # # 讀取影像
-    # image_path = cv2.imread(image_path)
-
-    # # 確認影像讀取成功
-    # if image_path is None:
-    #     raise ValueError(f"無法讀取影像：{image_path}")
-
-    # predict_time = time.time()
-    # ------------------------------
-    # 步驟 1: 進行姿態估計
-    # ------------------------------
-    # 使用 YOLOv8n-pose 進行姿態估計
-    print("Predicting pose...")
-    pose_results = pose_model.predict(image, conf=0.8, verbose=PREDICT_VERBOSE)
-
-    # 繪製姿態估計結果
-    pose_annotated_frames = []
-    for pose_result in pose_results:
-        pose_annotated_frames.append(pose_result.plot())
-
-    # ------------------------------
-    # 步驟 2: 進行物件偵測
-    # ------------------------------
-    # 使用你自訓練的物件偵測模型進行偵測
-    print("Predicting objects...")
-    object_results = object_model.predict(image, conf=0.1, verbose=PREDICT_VERBOSE)
-    # print(f"Predict Time: {(time.time() - predict_time)*1000:.2f} ms")
-
-    # draw_time = time.time()
-    # 獲取類別數量（假設類別編號從 0 開始連續編號）
-    num_classes = len(object_model.names)
-    colors = generate_colors(num_classes)
-
-    # 獲取類別名稱
-    class_names = object_model.names
-
-    # 複製姿態估計的結果框架以進行繪製
-    ret_combined_frames = []
-    # behaviors = []
-
-    for object_result, pose_annotated_frame in zip(object_results, pose_annotated_frames):
-        combined_frame = pose_annotated_frame.copy()
-
-        # 遍歷每一個偵測結果
-        for object in object_result.boxes:
-            # 獲取偵測框的座標
-            x1, y1, x2, y2 = map(int, object.xyxy[0].tolist())
-
-            # 獲取物件的置信度
-            confidence = object.conf[0]
-
-            # 獲取物件的類別編號
-            class_id = int(object.cls[0])
-
-            # 獲取物件的類別名稱
-            class_name = class_names[class_id] if class_id < len(class_names) else f"class_{class_id}"
-
-            # 獲取對應的顏色
-            color = colors[class_id]
-
-            # 繪製偵測框
-            cv2.rectangle(combined_frame, (x1, y1), (x2, y2), color, 2)
-
-            # 準備顯示的文字（類別名稱和置信度）
-            label = f"{class_name} {confidence:.2f}"
-
-            # 計算文字的寬高以確保文字不會超出框架
-            (text_width, text_height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-
-            # 調整文字背景的位置以避免超出影像範圍
-            text_y1 = y1 - text_height - 4 if y1 - text_height - 4 > 0 else y1
-
-            # 繪製文字背景
-            cv2.rectangle(
-                combined_frame,
-                (x1, text_y1),
-                (x1 + text_width, text_y1 + text_height + 4),
-                color,
-                -1,
-            )
+    """
+    舊版的單次推論介面，保留給既有的呼叫端.
 
-            # 在框架上繪製文字
-            cv2.putText(
-                combined_frame,
-                label,
-                (x1, text_y1 + text_height + 2),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (255, 255, 255),
-                1,
-            )
+    以暫時的 InferenceEngine（不使用 ROI 與追蹤）執行，與 MainWindow 和批次處理的推論路徑相同；
+    需要重複推論時請建立 InferenceEngine 並呼叫 InferenceEngine.predict_result，避免每次建立執行緒。
+    """
+    from .engine import InferenceEngine  # engine 匯入本模組
+
+    engine = InferenceEngine(pose_model, object_model, use_roi=False, track=False)
+    try:
+        return engine.predict_result(image, offsets)
+    finally:
+        engine.close()
 
-        ret_combined_frames.append(combined_frame)
-
-    # print(f"Draw Time: {(time.time() - draw_time)*1000:.2f} ms")
-
-    # behavior_time = time.time()
-    ret_behavior = predict_safe(pose_results, object_results, offsets)
-    # print(f"Behavior Time: {(time.time() - behavior_time)*1000:.2f} ms")
-
-    # # TODO: behavior判斷不準確 11/29改成不同攝影機處理不同行為
-    # ret_behavior = Behavior()
-    # for b in behaviors:
-    #     for field in fields(b):
-    #         behavior_value = getattr(b, field.name)
-    #         ret_behavior_value = getattr(ret_behavior, field.name)
-    #         if isinstance(behavior_value, SafeState):
-    #             if behavior_value != SafeState.UNDETECTED:
-    #                 if ret_behavior_value == SafeState.UNDETECTED:
-    #                     setattr(ret_behavior, field.name, behavior_value)
-    #                 else:
-    #                     if field.name == "is_knife_base_collided":
-    #                         setattr(
-    #                             ret_behavior,
-    #                             field.name,
-    #                             behavior_value or ret_behavior_value,
-    #                         )
-    #                     else:
-    #                         setattr(
-    #                             ret_behavior,
-    #                             field.name,
-    #                             behavior_value and ret_behavior_value,
-    #                         )
-    #         else:
-    #             if behavior_value != PoseState.UNKNOWN:
-    #                 setattr(ret_behavior, field.name, behavior_value)
+
+def judge_results(
+    pose_results: list[Results], object_results: list[Results], class_names: dict, offsets: dict
+) -> tuple[list[MatLike], Behavior]:
+    """繪製推論結果並判斷安全行為"""
+    ret_combined_frames = annotate_results(pose_results, object_results, class_names)
+
+    with profiler.span("predict_safe"):
+        ret_behavior = predict_safe(pose_results, object_results, offsets)
 
     return ret_combined_frames, ret_behavior
 
 
+def annotate_results(
+    pose_results: list[Results],
+    object_results: list[Results],
+    class_names: dict,
+    frames: list[MatLike] | None = None,
+) -> list[MatLike]:
+    """
+    在姿態估計的畫面上繪製物件偵測框.
+
+    若給定 frames，則把這組結果畫在新的畫面上（沿用上一次推論的結果顯示於中間的畫面）。
+    """
+    with profiler.span("annotate"):
+        # 繪製姿態估計結果
+        pose_annotated_frames = []
+        for idx, pose_result in enumerate(pose_results):
+            if frames is not None and idx < len(frames):
+                pose_annotated_frames.append(pose_result.plot(img=frames[idx]))
+            else:
+                pose_annotated_frames.append(pose_result.plot())
+
+        # 直接畫在姿態估計的結果上（plot() 已回傳新的畫面，不需要再複製）
+        renderer = get_renderer(class_names)
+        ret_combined_frames = []
+        for object_result, pose_annotated_frame in zip(object_results, pose_annotated_frames):
+            ret_combined_frames.append(renderer.draw(pose_annotated_frame, object_result))
+
+    return ret_combined_frames
+
+
 # def predict_multiple(
 #     images: list[str | MatLike], pose_model: YOLO, object_model: YOLO, offsets: dict
 # ) -> tuple[list[MatLike], Behavior]:
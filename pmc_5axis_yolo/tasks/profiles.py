@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import time
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from ..settings import (
+    CAMERA_COUNT,
+    DEFAULT_OFFSETS,
+    MACHINE_ID,
+    PROFILE_DIR,
+    PROFILE_MIN_CONF,
+    PROFILE_TOLERANCE,
+)
+from ..utils import Region, extract_object_regions
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+
+PROFILE_VERSION = 1
+REFERENCE_CLASSES = ["stop", "feed", "knife", "base"]
+
+
+@dataclass
+class Profile:
+    """
+    一台機台與攝影機配置的設定檔: 偏移值、各攝影機的 ROI 與攝影機順序.
+
+    camera_order[i] 為第 i 個位置（0: 刀具與底座、1: 控制器、2: 全身姿態）使用的攝影機編號；
+    reference 記錄儲存時各攝影機偵測到的物件中心，開啟攝影機時以一張畫面比對，判斷是否需要重新校正。
+    """
+
+    machine: str
+    camera_count: int = CAMERA_COUNT
+    camera_order: list[int] = field(default_factory=lambda: list(range(CAMERA_COUNT)))
+    resolutions: list[list[int]] = field(default_factory=list)  # 各攝影機的 [width, height]
+    offsets: dict = field(default_factory=lambda: DEFAULT_OFFSETS.copy())
+    rois: dict[int, list[int]] = field(default_factory=dict)  # 攝影機位置 -> [x_min, x_max, y_min, y_max]
+    reference: dict[int, dict[str, list[float]]] = field(default_factory=dict)  # 攝影機位置 -> 類別 -> [x, y]
+    calibration: dict = field(default_factory=dict)  # 最近一次校正的資訊，例如信賴區間與畫面數
+    version: int = PROFILE_VERSION
+    saved_at: str = ""
+
+    def regions(self) -> dict[int, Region]:
+        return {idx: Region(*bounds) for idx, bounds in self.rois.items()}
+
+    def set_regions(self, regions: dict[int, Region]):
+        self.rois = {idx: [r.x_min, r.x_max, r.y_min, r.y_max] for idx, r in regions.items()}
+
+
+def machine_id() -> str:
+    """settings.MACHINE_ID，未設定時使用電腦名稱"""
+    return MACHINE_ID or platform.node() or "default"
+
+
+def profile_path(machine: str | None = None, camera_count: int = CAMERA_COUNT) -> str:
+    machine = machine or machine_id()
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in machine)
+    return os.path.join(PROFILE_DIR, f"{safe}_{camera_count}cam.json")
+
+
+def load_profile(path: str | None = None) -> Profile | None:
+    """讀取設定檔；不存在、格式錯誤或版本不符時回傳 None"""
+    path = path or profile_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Failed to read profile {path}: {e}")
+        return None
+    if data.get("version") != PROFILE_VERSION:
+        print(f"Profile {path} has version {data.get('version')}, expected {PROFILE_VERSION}. Ignoring it.")
+        return None
+    # JSON 的 key 只能是字串
+    data["rois"] = {int(idx): bounds for idx, bounds in data.get("rois", {}).items()}
+    data["reference"] = {int(idx): points for idx, points in data.get("reference", {}).items()}
+    try:
+        return Profile(**data)
+    except TypeError as e:
+        print(f"Invalid profile {path}: {e}")
+        return None
+
+
+def save_profile(profile: Profile, path: str | None = None) -> str:
+    """先寫入暫存檔再取代，寫入中途中斷也不會留下損壞的設定檔"""
+    path = path or profile_path(profile.machine, profile.camera_count)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    profile.saved_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(asdict(profile), f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def reference_points(object_results: list[Results], min_conf: float = PROFILE_MIN_CONF) -> dict[int, dict]:
+    """各攝影機可信的物件中心，儲存為設定檔的比對基準"""
+    reference = {}
+    for idx, result in enumerate(object_results):
+        regions = extract_object_regions(result, REFERENCE_CLASSES)
+        points = {
+            name: [(region.x_min + region.x_max) / 2, (region.y_min + region.y_max) / 2]
+            for name, region in regions.items()
+            if region is not None and region.conf >= min_conf
+        }
+        if points:
+            reference[idx] = points
+    return reference
+
+
+def validate_profile(
+    profile: Profile,
+    object_results: list[Results],
+    resolutions: list[list[int]],
+    tolerance: float = PROFILE_TOLERANCE,
+) -> tuple[bool, str]:
+    """
+    以一組畫面的物件偵測結果檢查設定檔是否仍然適用.
+
+    攝影機數量或解析度不同、基準物件沒有偵測到，或物件中心偏移超過 tolerance pixels 時不通過。
+    """
+    if profile.resolutions and profile.resolutions != resolutions:
+        return False, f"camera resolutions changed: {profile.resolutions} -> {resolutions}"
+    if not profile.reference:
+        return False, "profile has no reference objects"
+
+    current = reference_points(object_results, min_conf=0.0)
+    for idx, points in profile.reference.items():
+        for name, (x, y) in points.items():
+            found = current.get(idx, {}).get(name)
+            if found is None:
+                return False, f"camera {idx}: {name} not found"
+            distance = float(np.hypot(found[0] - x, found[1] - y))
+            if distance > tolerance:
+                return False, f"camera {idx}: {name} moved {distance:.0f} px"
+    return True, "profile matches the current view"
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import math
+import threading
+from typing import TYPE_CHECKING
+
+from cv2.typing import MatLike
+
+from ..settings import ROI_MAX_IMGSZ, ROI_MIN_CONF, ROI_PADDING, ROI_RESET_MISSES, ROI_TARGETS
+from ..utils import Region, extract_object_regions
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+
+ALL_TARGETS = ("stop", "feed", "knife", "base")
+
+
+def targets_for(idx: int, cameras: int) -> tuple[str, ...]:
+    """每台攝影機 ROI 需要涵蓋的物件；只有一台攝影機時涵蓋全部"""
+    if cameras == 1:
+        return ALL_TARGETS
+    return tuple(ROI_TARGETS.get(idx, ()))
+
+
+def seed_region(
+    object_result: Results, targets: tuple[str, ...], padding: float = ROI_PADDING, min_conf: float = ROI_MIN_CONF
+) -> Region | None:
+    """所有 targets 都以足夠的置信度偵測到時，回傳涵蓋它們並向外擴張 padding 比例的範圍"""
+    if not targets:
+        return None
+    regions = extract_object_regions(object_result, list(targets))
+    if any(region is None or region.conf < min_conf for region in regions.values()):
+        return None
+
+    x_min = min(region.x_min for region in regions.values())
+    x_max = max(region.x_max for region in regions.values())
+    y_min = min(region.y_min for region in regions.values())
+    y_max = max(region.y_max for region in regions.values())
+    pad_x = int((x_max - x_min) * padding)
+    pad_y = int((y_max - y_min) * padding)
+    height, width = object_result.orig_shape
+    return Region(max(0, x_min - pad_x), min(width, x_max + pad_x), max(0, y_min - pad_y), min(height, y_max + pad_y))
+
+
+def shift_result(result: Results, frame: MatLike, x_offset: int, y_offset: int) -> Results:
+    """將裁切畫面上的偵測框平移回完整畫面的座標，回傳以完整畫面為 orig_img 的 Results"""
+    from ultralytics.engine.results import Results
+
+    data = result.boxes.data.clone()
+    data[:, [0, 2]] += x_offset
+    data[:, [1, 3]] += y_offset
+    return Results(frame, path=result.path, names=result.names, boxes=data)
+
+
+class CameraRois:
+    """
+    每台攝影機的物件偵測範圍 (ROI).
+
+    尚未設定 ROI 的攝影機以完整畫面偵測，第一次所有目標物件都被可信地偵測到時自動設定；
+    也可以由介面手動設定或清除後重新取得。ROI 內連續 max_misses 次偵測不到所有目標物件時
+    （例如攝影機被碰歪），自動清除該 ROI 並回到完整畫面偵測。推論執行緒與 GUI 執行緒都會存取，以 lock 保護。
+    """
+
+    def __init__(self, max_misses: int = ROI_RESET_MISSES):
+        self.max_misses = max_misses
+        self._rois: dict[int, Region] = {}
+        self._misses: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, idx: int) -> Region | None:
+        with self._lock:
+            return self._rois.get(idx)
+
+    def set(self, idx: int, region: Region | None):
+        with self._lock:
+            self._misses.pop(idx, None)
+            if region is None:
+                self._rois.pop(idx, None)
+            else:
+                self._rois[idx] = region
+
+    def reset(self):
+        """清除所有 ROI，下一次可信的偵測結果會重新設定"""
+        with self._lock:
+            self._rois.clear()
+            self._misses.clear()
+
+    def items(self) -> dict[int, Region]:
+        with self._lock:
+            return dict(self._rois)
+
+    def crop(self, frames: list[MatLike]) -> tuple[dict[int, Region], list[MatLike], int | None]:
+        """
+        裁切有 ROI 的畫面.
+
+        Returns:
+            tuple: (攝影機索引 -> 使用的 ROI, 裁切後的畫面, 推論用的 imgsz)。
+            imgsz 為最大裁切邊長進位到 32 的倍數，模型只需處理這個大小的輸入。
+        """
+        rois = {idx: roi for idx, roi in self.items().items() if idx < len(frames)}
+        crops = [frames[idx][roi.y_min : roi.y_max, roi.x_min : roi.x_max] for idx, roi in rois.items()]
+        if not crops:
+            return rois, crops, None
+        longest = max(max(crop.shape[:2]) for crop in crops)
+        imgsz = min(ROI_MAX_IMGSZ, math.ceil(longest / 32) * 32)
+        return rois, crops, imgsz
+
+    @staticmethod
+    def uncrop(rois: dict[int, Region], results: list[Results], frames: list[MatLike]) -> dict[int, Results]:
+        """裁切畫面的結果對應回完整畫面；rois 為 crop() 回傳的範圍，推論期間 ROI 被修改也不受影響"""
+        return {
+            idx: shift_result(result, frames[idx], roi.x_min, roi.y_min)
+            for (idx, roi), result in zip(rois.items(), results)
+        }
+
+    def check(self, object_results: dict[int, Results], cameras: int):
+        """
+        以 ROI 內的偵測結果（攝影機索引 -> 對應回完整畫面的 Results）檢查 ROI 是否仍涵蓋目標物件.
+
+        任一目標物件沒有被偵測到就累計一次，連續 max_misses 次時清除該 ROI。
+        """
+        for idx, result in object_results.items():
+            targets = targets_for(idx, cameras)
+            regions = extract_object_regions(result, list(targets)) if targets else {}
+            with self._lock:
+                if all(region is not None for region in regions.values()):
+                    self._misses.pop(idx, None)
+                    continue
+                self._misses[idx] = self._misses.get(idx, 0) + 1
+                if self._misses[idx] < self.max_misses:
+                    continue
+                self._misses.pop(idx)
+                self._rois.pop(idx, None)
+            print(f"Camera {idx} ROI: targets missing for {self.max_misses} detections, detecting full frames again.")
+
+    def seed(self, object_results: dict[int, Results], cameras: int):
+        """以完整畫面的偵測結果 (攝影機索引 -> Results) 設定尚未有 ROI 的攝影機"""
+        for idx, result in object_results.items():
+            if self.get(idx) is not None:
+                continue
+            region = seed_region(result, targets_for(idx, cameras))
+            if region is not None:
+                print(f"Camera {idx} ROI: ({region.x_min}, {region.y_min}) - ({region.x_max}, {region.y_max})")
+                self.set(idx, region)
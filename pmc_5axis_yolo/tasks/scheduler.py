@@ -0,0 +1,82 @@
+import math
+import time
+
+from ..settings import SCHEDULER_MAX_LOAD, SCHEDULER_MAX_STRIDE
+
+
+class RateMeter:
+    """以指數移動平均估計事件的頻率 (Hz)"""
+
+    def __init__(self, smoothing: float = 0.9):
+        self.smoothing = smoothing
+        self.rate = 0.0
+        self._last = None
+
+    def mark(self, now: float | None = None):
+        now = time.perf_counter() if now is None else now
+        if self._last is not None and now > self._last:
+            instant = 1 / (now - self._last)
+            self.rate = instant if self.rate == 0 else self.smoothing * self.rate + (1 - self.smoothing) * instant
+        self._last = now
+
+    def reset(self):
+        self.rate = 0.0
+        self._last = None
+
+
+class AdaptiveScheduler:
+    """
+    依實測的端到端推論延遲決定推論頻率.
+
+    每張畫面都會顯示，但只有每 stride 張畫面送去推論；
+    stride 會讓推論執行緒的負載維持在 max_load 以下，中間的畫面沿用最新的推論結果。
+    """
+
+    def __init__(
+        self,
+        display_fps: float,
+        max_load: float = SCHEDULER_MAX_LOAD,
+        max_stride: int = SCHEDULER_MAX_STRIDE,
+    ):
+        self.frame_interval = 1 / display_fps if display_fps > 0 else 1 / 30
+        self.max_load = max_load
+        self.max_stride = max_stride
+        self.display = RateMeter()
+        self.inference = RateMeter()
+        self.reset()
+
+    def reset(self):
+        self.stride = 1
+        self.latency = 0.0  # 秒，指數移動平均
+        self._since_submit = self.max_stride
+        self._submitted_at = None
+        self.display.reset()
+        self.inference.reset()
+
+    def tick(self) -> bool:
+        """每張顯示的畫面呼叫一次，回傳這張畫面是否該送去推論"""
+        self.display.mark()
+        self._since_submit += 1
+        return self._since_submit >= self.stride
+
+    def submitted(self):
+        self._since_submit = 0
+        self._submitted_at = time.perf_counter()
+
+    def completed(self):
+        """推論結果回到 GUI 時呼叫，更新延遲與 stride"""
+        if self._submitted_at is None:
+            return
+        now = time.perf_counter()
+        latency = now - self._submitted_at
+        self._submitted_at = None
+        self.latency = latency if self.latency == 0 else 0.8 * self.latency + 0.2 * latency
+        self.inference.mark(now)
+        stride = math.ceil(self.latency / (self.frame_interval * self.max_load))
+        self.stride = max(1, min(self.max_stride, stride))
+
+    def status(self) -> str:
+        return (
+            f"Display {self.display.rate:.1f} FPS | Inference {self.inference.rate:.1f} FPS | "
+            f"every {self.stride} frame(s) | latency {self.latency * 1000:.0f} ms"
+        )
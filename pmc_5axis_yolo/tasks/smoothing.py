@@ -0,0 +1,102 @@
+from dataclasses import fields
+from enum import Enum
+
+import numpy as np
+
+from ..settings import DEBOUNCE_FRAMES, SMOOTHING_DECAY, SMOOTHING_MODE, SMOOTHING_WINDOW
+from .predict import Behavior
+
+
+class StateFilter:
+    """
+    單一欄位的串流濾波器，每張畫面 O(1) 更新.
+
+    mode:
+        majority: 最近 window 張畫面的多數決（固定大小的環狀緩衝區）
+        decay: 指數衰減的分數，分數最高的狀態勝出
+        debounce: 新狀態需連續出現 debounce 張畫面才切換
+        off: 不濾波
+    平手時維持目前的狀態（遲滯），避免在兩個狀態間跳動。
+    """
+
+    def __init__(
+        self,
+        states: list[Enum],
+        initial: Enum,
+        mode: str = SMOOTHING_MODE,
+        window: int = SMOOTHING_WINDOW,
+        decay: float = SMOOTHING_DECAY,
+        debounce: int = DEBOUNCE_FRAMES,
+    ):
+        if mode not in ("majority", "decay", "debounce", "off"):
+            raise ValueError(f"Unknown smoothing mode: {mode}")
+        self.states = states
+        self.index = {state: i for i, state in enumerate(states)}
+        self.initial = initial
+        self.mode = mode
+        self.window = max(1, window)
+        self.decay = decay
+        self.debounce = max(1, debounce)
+        self.reset()
+
+    def reset(self):
+        self.current = self.index[self.initial]
+        self._buffer = np.full(self.window, -1, dtype=np.int8)
+        self._pos = 0
+        self._counts = np.zeros(len(self.states), dtype=np.int32)
+        self._scores = np.zeros(len(self.states), dtype=np.float64)
+        self._candidate = self.current
+        self._streak = 0
+
+    def update(self, state: Enum) -> Enum:
+        idx = self.index[state]
+        match self.mode:
+            case "majority":
+                old = self._buffer[self._pos]
+                if old >= 0:
+                    self._counts[old] -= 1
+                self._buffer[self._pos] = idx
+                self._counts[idx] += 1
+                self._pos = (self._pos + 1) % self.window
+                self._switch_to_best(self._counts)
+            case "decay":
+                self._scores *= self.decay
+                self._scores[idx] += 1 - self.decay
+                self._switch_to_best(self._scores)
+            case "debounce":
+                if idx == self.current:
+                    self._streak = 0
+                else:
+                    self._streak = self._streak + 1 if idx == self._candidate else 1
+                    self._candidate = idx
+                    if self._streak >= self.debounce:
+                        self.current = idx
+                        self._streak = 0
+            case _:
+                self.current = idx
+        return self.states[self.current]
+
+    def _switch_to_best(self, scores: np.ndarray):
+        best = int(scores.argmax())
+        if scores[best] > scores[self.current]:
+            self.current = best
+
+
+class BehaviorFilter:
+    """對 Behavior 的每個欄位做時間上的平滑，供 SOP 步驟與警示使用"""
+
+    def __init__(self, **kwargs):
+        default = Behavior()
+        self.filters = {
+            field.name: StateFilter(
+                list(type(getattr(default, field.name))), getattr(default, field.name), **kwargs
+            )
+            for field in fields(Behavior)
+        }
+
+    def update(self, behavior: Behavior) -> Behavior:
+        return Behavior(**{name: f.update(getattr(behavior, name)) for name, f in self.filters.items()})
+
+    def reset(self):
+        for f in self.filters.values():
+            f.reset()
@@ -0,0 +1,152 @@
+import os
+from dataclasses import dataclass
+
+from ..settings import SOP_DIR, SOP_LANGUAGE
+from .sop_machine import MACHINE_FILE
+
+STEPS_FILE = "SOP_step.txt"  # 每行一個步驟標題
+TABLE_FILE = "steps_table.txt"  # 每行一個步驟說明檔的路徑
+DEFAULT_SOP = "default"  # SOP_DIR 本身的 SOP
+
+
+@dataclass(frozen=True)
+class SopStep:
+    title: str
+    text: str
+
+
+def localized(path: str, language: str | None) -> str:
+    """step1.txt -> step1.<language>.txt，翻譯檔不存在時使用原本的檔案"""
+    if language:
+        root, ext = os.path.splitext(path)
+        candidate = f"{root}.{language}{ext}"
+        if os.path.exists(candidate):
+            return candidate
+    return path
+
+
+class SopDocument:
+    """
+    一份 SOP 的所有步驟標題與說明，一次讀入記憶體.
+
+    folder 內的 SOP_step.txt 為步驟標題，steps_table.txt 列出各步驟說明檔的路徑（相對於 folder 或工作目錄），
+    sop_machine.json 為自動切換步驟的狀態機（由 load_machine 讀取，這裡只監看修改時間）。
+    language 不為 None 時優先讀取 <檔名>.<language>.txt。切換步驟只查詢記憶體；
+    reload_if_changed() 比對檔案修改時間，有變更時重新讀取，讀取失敗則保留原本的內容。
+    """
+
+    def __init__(self, folder: str, language: str | None = None):
+        self.folder = folder
+        self.language = language
+        self.steps: list[SopStep] = []
+        self._mtimes: dict[str, float] = {}
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def _read_lines(self, path: str) -> list[str]:
+        # 空白行也算一行，步驟編號與檔案的行號一致
+        with open(path, "r", encoding="utf-8") as file:
+            return [line.strip() for line in file]
+
+    def _resolve(self, entry: str) -> str:
+        path = os.path.join(self.folder, entry)
+        return path if os.path.exists(path) else entry
+
+    def load(self):
+        """讀取所有檔案；標題或步驟表不存在時丟出 FileNotFoundError"""
+        steps_file = localized(os.path.join(self.folder, STEPS_FILE), self.language)
+        table_file = os.path.join(self.folder, TABLE_FILE)
+        titles = self._read_lines(steps_file)
+        table = self._read_lines(table_file) if os.path.exists(table_file) else []
+
+        files = [steps_file, table_file, os.path.join(self.folder, MACHINE_FILE)]
+        steps = []
+        for i, title in enumerate(titles):
+            text = ""
+            if i < len(table) and table[i]:
+                path = localized(self._resolve(table[i]), self.language)
+                files.append(path)
+                try:
+                    with open(path, "r", encoding="utf-8") as file:
+                        text = file.read().strip()
+                except FileNotFoundError:
+                    print(f"SOP step {i + 1}: {path} not found.")
+            steps.append(SopStep(title, text))
+
+        self.steps = steps
+        self._mtimes = {path: self._mtime(path) for path in files}
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0.0
+
+    def changed(self) -> bool:
+        return any(self._mtime(path) != mtime for path, mtime in self._mtimes.items())
+
+    def reload_if_changed(self) -> bool:
+        """檔案有變更時重新讀取，回傳是否已重新讀取"""
+        if not self.changed():
+            return False
+        try:
+            self.load()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Failed to reload SOP {self.folder}: {e}")
+            self._mtimes = {path: self._mtime(path) for path in self._mtimes}  # 檔案再次變更前不重試
+            return False
+        print(f"SOP {self.folder} reloaded ({len(self)} steps).")
+        return True
+
+    def title(self, step_number: int) -> str:
+        """第 step_number 步（從 1 開始）的標題，超出範圍時為 N/A"""
+        if 0 < step_number <= len(self.steps):
+            return self.steps[step_number - 1].title
+        return "N/A"
+
+    def text(self, step_number: int) -> str:
+        if 0 < step_number <= len(self.steps):
+            return self.steps[step_number - 1].text
+        return ""
+
+    def languages(self) -> list[str]:
+        """folder 內有翻譯的標題檔（SOP_step.<language>.txt）的語言"""
+        root, ext = os.path.splitext(STEPS_FILE)
+        languages = []
+        for name in sorted(os.listdir(self.folder)):
+            if name.startswith(f"{root}.") and name.endswith(ext) and name != STEPS_FILE:
+                languages.append(name[len(root) + 1 : -len(ext)])
+        return languages
+
+
+class SopLibrary:
+    """
+    SOP_DIR 底下所有的 SOP.
+
+    SOP_DIR 本身為 default，每個含有 SOP_step.txt 的子資料夾為一份以資料夾名稱命名的 SOP。
+    已讀取的 (SOP, 語言) 會被快取，切換時不需重新讀檔。
+    """
+
+    def __init__(self, root: str = SOP_DIR):
+        self.root = root
+        self._documents: dict[tuple[str, str | None], SopDocument] = {}
+
+    def names(self) -> list[str]:
+        names = [DEFAULT_SOP] if os.path.exists(os.path.join(self.root, STEPS_FILE)) else []
+        if os.path.isdir(self.root):
+            for name in sorted(os.listdir(self.root)):
+                if os.path.exists(os.path.join(self.root, name, STEPS_FILE)):
+                    names.append(name)
+        return names
+
+    def folder(self, name: str) -> str:
+        return self.root if name == DEFAULT_SOP else os.path.join(self.root, name)
+
+    def get(self, name: str = DEFAULT_SOP, language: str | None = SOP_LANGUAGE) -> SopDocument:
+        key = (name, language)
+        if key not in self._documents:
+            self._documents[key] = SopDocument(self.folder(name), language)
+        return self._documents[key]
@@ -0,0 +1,207 @@
+"""
+由設定檔定義的 SOP 狀態機，取代寫死在 MainWindow 的步驟切換.
+
+與 steps_table.txt 放在同一個資料夾的 sop_machine.json:
+    {
+        "initial": "idle",
+        "states": {"idle": {"step": 1}, "preparing": {"step": 1}, ...},
+        "transitions": [
+            {"from": ["idle", "running"], "to": "preparing", "when": {"human_pose": "ARM_STRETCH"},
+             "dwell": 0, "cooldown": 20},
+            ...
+        ]
+    }
+when 的 key 為 Behavior 的欄位，值為狀態名稱（或名稱的列表，符合任一即可）；
+條件需連續成立 dwell 秒，且進入目前狀態已超過 cooldown 秒才會切換。
+
+重播錄製的 Behavior 時間軸 (pmc_5axis_yolo.cli 輸出的 behaviors.jsonl):
+    python -m pmc_5axis_yolo.tasks.sop_machine outputs/behaviors.jsonl --rules texts/sop_machine.json
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+from dataclasses import dataclass, fields
+
+from .predict import Behavior
+
+MACHINE_FILE = "sop_machine.json"
+BEHAVIOR_STATES = {f.name: type(getattr(Behavior(), f.name)) for f in fields(Behavior)}
+
+
+@dataclass(frozen=True)
+class Transition:
+    source: str
+    target: str
+    when: tuple[tuple[str, frozenset[str]], ...]  # (Behavior 欄位, 符合的狀態名稱)
+    dwell: float = 0.0
+    cooldown: float = 0.0
+
+    def matches(self, values: dict[str, str]) -> bool:
+        return all(values.get(name) in accepted for name, accepted in self.when)
+
+
+@dataclass(frozen=True)
+class SopStatus:
+    state: str
+    step: int
+    changed: bool = False  # 這次 update 是否切換了狀態
+
+
+def behavior_values(behavior: Behavior) -> dict[str, str]:
+    """Behavior -> {欄位: 狀態名稱}，與 behaviors.jsonl 的紀錄格式相同"""
+    return {name: getattr(behavior, name).name for name in BEHAVIOR_STATES}
+
+
+def parse_transitions(definition: dict, states: dict[str, int]) -> list[Transition]:
+    """檢查並轉換 transitions；狀態、欄位或欄位值不存在時丟出 ValueError"""
+    transitions = []
+    for i, item in enumerate(definition.get("transitions", [])):
+        sources = item["from"] if isinstance(item["from"], list) else [item["from"]]
+        for state in [*sources, item["to"]]:
+            if state not in states:
+                raise ValueError(f"Transition {i}: unknown state {state!r}")
+        when = []
+        for name, accepted in item.get("when", {}).items():
+            if name not in BEHAVIOR_STATES:
+                raise ValueError(f"Transition {i}: unknown Behavior field {name!r}")
+            accepted = accepted if isinstance(accepted, list) else [accepted]
+            unknown = set(accepted) - set(BEHAVIOR_STATES[name].__members__)
+            if unknown:
+                raise ValueError(f"Transition {i}: {name} has no state {', '.join(sorted(unknown))}")
+            when.append((name, frozenset(accepted)))
+        for source in sources:
+            transitions.append(
+                Transition(
+                    source, item["to"], tuple(when), float(item.get("dwell", 0)), float(item.get("cooldown", 0))
+                )
+            )
+    return transitions
+
+
+class SopMachine:
+    """
+    表格驅動的 SOP 狀態機.
+
+    轉移依來源狀態建立索引，每張畫面只檢查目前狀態的轉移，成本與 SOP 的總長度無關。
+    推論執行緒呼叫 update()，GUI 的上一步 / 下一步按鈕呼叫 jump()，以 lock 保護。
+    """
+
+    def __init__(self, definition: dict):
+        self.states = {name: int(state["step"]) for name, state in definition["states"].items()}
+        self.initial = definition.get("initial", next(iter(self.states)))
+        if self.initial not in self.states:
+            raise ValueError(f"Unknown initial state {self.initial!r}")
+        self.transitions: dict[str, list[Transition]] = {name: [] for name in self.states}
+        for transition in parse_transitions(definition, self.states):
+            self.transitions[transition.source].append(transition)
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_file(cls, path: str) -> "SopMachine":
+        with open(path, "r", encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    @property
+    def status(self) -> SopStatus:
+        return SopStatus(self.state, self.states[self.state])
+
+    def reset(self):
+        with self._lock:
+            self._enter(self.initial, -math.inf)  # 第一次轉移不受 cooldown 限制
+
+    def _enter(self, state: str, timestamp: float):
+        self.state = state
+        self.entered_at = timestamp
+        self._holding: dict[int, float] = {}  # 目前狀態的轉移索引 -> 條件開始連續成立的時間
+
+    def jump(self, step: int) -> SopStatus:
+        """手動切換到第 step 步（第一個屬於該步驟的狀態），切換後的第一次轉移不受 cooldown 限制"""
+        with self._lock:
+            state = next((name for name, s in self.states.items() if s == step), None)
+            if state is not None and self.states[self.state] != step:
+                self._enter(state, -math.inf)
+            return self.status
+
+    def update(self, behavior: Behavior | dict[str, str], timestamp: float) -> SopStatus:
+        """以一張畫面（平滑後）的 Behavior 推進狀態機；timestamp 為秒"""
+        values = behavior if isinstance(behavior, dict) else behavior_values(behavior)
+        with self._lock:
+            for i, transition in enumerate(self.transitions[self.state]):
+                if not transition.matches(values):
+                    self._holding.pop(i, None)
+                    continue
+                since = self._holding.setdefault(i, timestamp)
+                if timestamp - since >= transition.dwell and timestamp - self.entered_at > transition.cooldown:
+                    self._enter(transition.target, timestamp)
+                    return SopStatus(self.state, self.states[self.state], changed=True)
+            return self.status
+
+
+def load_machine(folder: str) -> SopMachine | None:
+    """讀取 SOP 資料夾內的 sop_machine.json；不存在時回傳 None（只能手動切換步驟）"""
+    path = os.path.join(folder, MACHINE_FILE)
+    if not os.path.exists(path):
+        return None
+    return SopMachine.from_file(path)
+
+
+def load_timeline(path: str) -> list[dict]:
+    """讀取 behaviors.jsonl"""
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def replay(machine: SopMachine, records: list[dict], smoothed: bool = True) -> list[dict]:
+    """
+    以錄製的 Behavior 時間軸重播狀態機，回傳每次狀態切換的紀錄.
+
+    smoothed=True 時優先使用紀錄中的 smoothed_<欄位>（與視窗使用的值相同）。
+    每個來源 (source) 從初始狀態開始。
+    """
+    changes = []
+    source = None
+    for record in records:
+        if record.get("source") != source:
+            source = record.get("source")
+            machine.reset()
+        values = {
+            name: record.get(f"smoothed_{name}", record.get(name)) if smoothed else record.get(name)
+            for name in BEHAVIOR_STATES
+        }
+        previous = machine.state
+        status = machine.update(values, float(record["timestamp"]))
+        if status.changed:
+            changes.append(
+                {
+                    "source": source,
+                    "frame": record.get("frame"),
+                    "timestamp": record["timestamp"],
+                    "from": previous,
+                    "to": status.state,
+                    "step": status.step,
+                }
+            )
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("timeline", help="behaviors.jsonl from pmc_5axis_yolo.cli")
+    parser.add_argument("--rules", default=os.path.join("texts", MACHINE_FILE), help="state machine definition")
+    parser.add_argument("--raw", action="store_true", help="use unsmoothed Behavior fields")
+    args = parser.parse_args(argv)
+
+    machine = SopMachine.from_file(args.rules)
+    for change in replay(machine, load_timeline(args.timeline), smoothed=not args.raw):
+        print(
+            f"{change['source']} frame {change['frame']} ({change['timestamp']:.2f} s): "
+            f"{change['from']} -> {change['to']} (step {change['step']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from ..settings import DETECT_INTERVAL, TRACK_MAX_FB_ERROR, TRACK_MIN_CONFIDENCE, TRACK_POINTS
+from ..utils import boxes_to_numpy
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+
+LK_PARAMS = {
+    "winSize": (15, 15),
+    "maxLevel": 2,
+    "criteria": (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+}
+
+
+class BoxTracker:
+    """
+    以 Lucas-Kanade 光流追蹤單一攝影機的偵測框.
+
+    偵測時在每個框內取角點，之後每張畫面以前後向光流追蹤這些點，框依有效點的位移中位數平移。
+    confidence 為各框目前仍被追蹤到的點數相對於開始追蹤時點數的最小比例，點逐漸流失或整個框失去所有點都會反映出來；
+    開始時沒有角點的框（紋理太少）視為靜止，不計入 confidence；沒有任何框取到角點（包括沒有偵測到物件）時 confidence 為 0，
+    每次都重新偵測，畫面中新出現的物件不會被追蹤漏掉。
+    """
+
+    def __init__(self, max_points: int = TRACK_POINTS, max_fb_error: float = TRACK_MAX_FB_ERROR):
+        self.max_points = max_points
+        self.max_fb_error = max_fb_error
+        self.boxes = np.zeros((0, 6), dtype=np.float32)
+        self.names: dict[int, str] = {}
+        self.confidence = 0.0
+        self._gray = None
+        self._points = np.zeros((0, 1, 2), dtype=np.float32)
+        self._owners = np.zeros(0, dtype=np.int32)  # 每個點屬於哪個框
+        self._seeded = np.zeros(0, dtype=np.int32)  # 開始追蹤時每個框的點數
+
+    def start(self, frame: MatLike, result: Results):
+        """以偵測結果重新開始追蹤"""
+        self._gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.boxes = boxes_to_numpy(result).astype(np.float32)
+        self.names = result.names
+        self.confidence = 1.0
+
+        height, width = self._gray.shape
+        points, owners = [], []
+        for i, (x1, y1, x2, y2) in enumerate(self.boxes[:, :4].astype(np.int32)):
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(width, x2), min(height, y2)
+            if x2 - x1 < 3 or y2 - y1 < 3:
+                continue
+            corners = cv2.goodFeaturesToTrack(
+                self._gray[y1:y2, x1:x2], maxCorners=self.max_points, qualityLevel=0.01, minDistance=3
+            )
+            if corners is None:
+                continue
+            corners += np.array([x1, y1], dtype=np.float32)
+            points.append(corners)
+            owners.append(np.full(len(corners), i, dtype=np.int32))
+        self._points = np.concatenate(points) if points else np.zeros((0, 1, 2), dtype=np.float32)
+        self._owners = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int32)
+        self._seeded = np.bincount(self._owners, minlength=len(self.boxes))
+
+    def update(self, frame: MatLike) -> np.ndarray:
+        """追蹤到新的畫面，回傳平移後的框 (N, 6)，並更新 confidence"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self._gray is None or gray.shape != self._gray.shape:
+            self.confidence = 0.0
+            return self.boxes
+        if not len(self._points):
+            self._gray = gray
+            self.confidence = 0.0  # 所有點都已流失，或一開始就沒有可追蹤的點
+            return self.boxes
+
+        # 前向追蹤後再反向追蹤回上一張畫面，兩者的距離過大代表追蹤失敗
+        forward, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, self._points, None, **LK_PARAMS)
+        backward, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._gray, forward, None, **LK_PARAMS)
+        fb_error = np.linalg.norm((self._points - backward).reshape(-1, 2), axis=1)
+        valid = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+
+        motion = (forward - self._points).reshape(-1, 2)
+        for i in np.unique(self._owners[valid]):
+            tracked = (self._owners == i) & valid
+            dx, dy = np.median(motion[tracked], axis=0)
+            self.boxes[i, [0, 2]] += dx
+            self.boxes[i, [1, 3]] += dy
+
+        # 相對於開始時的點數；點全部流失的框為 0
+        surviving = np.bincount(self._owners[valid], minlength=len(self.boxes))
+        seeded = self._seeded > 0
+        self.confidence = float((surviving[seeded] / self._seeded[seeded]).min()) if seeded.any() else 0.0
+        self._gray = gray
+        self._points = forward[valid]
+        self._owners = self._owners[valid]
+        return self.boxes
+
+    def result(self, frame: MatLike) -> Results:
+        import torch
+        from ultralytics.engine.results import Results
+
+        return Results(frame, path="", names=self.names, boxes=torch.from_numpy(self.boxes.copy()))
+
+
+class DetectionTracker:
+    """
+    偵測並追蹤: 每 interval 次才執行物件偵測，其餘以光流追蹤上一次的偵測框.
+
+    任一攝影機的追蹤 confidence 低於 min_confidence，或畫面數量、大小改變時，立即重新偵測。
+    """
+
+    def __init__(self, interval: int = DETECT_INTERVAL, min_confidence: float = TRACK_MIN_CONFIDENCE):
+        self.interval = interval
+        self.min_confidence = min_confidence
+        self.trackers: list[BoxTracker] = []
+        self.since_detection = 0
+        self.detections = 0
+        self.tracked = 0
+        self._invalid = True
+
+    def invalidate(self):
+        """下一次一定重新偵測（例如切換影片或攝影機）"""
+        self._invalid = True
+
+    def track(self, frames: list[MatLike]) -> list[Results] | None:
+        """回傳追蹤後的結果；需要重新偵測時回傳 None"""
+        if self._invalid or len(frames) != len(self.trackers) or self.since_detection >= self.interval - 1:
+            return None
+        for tracker, frame in zip(self.trackers, frames):
+            tracker.update(frame)
+        if min(tracker.confidence for tracker in self.trackers) < self.min_confidence:
+            return None
+        self.since_detection += 1
+        self.tracked += 1
+        return [tracker.result(frame) for tracker, frame in zip(self.trackers, frames)]
+
+    def start(self, frames: list[MatLike], results: list[Results]):
+        """以新的偵測結果重新開始追蹤"""
+        self.trackers = [BoxTracker() for _ in frames]
+        for tracker, frame, result in zip(self.trackers, frames, results):
+            tracker.start(frame, result)
+        self.since_detection = 0
+        self.detections += 1
+        self._invalid = False
+
+    def stats(self) -> dict:
+        total = self.detections + self.tracked
+        return {
+            "detections": self.detections,
+            "tracked": self.tracked,
+            "detect_ratio": self.detections / total if total else 0.0,
+        }
@@ -0,0 +1,131 @@
+import threading
+import time
+
+from cv2.typing import MatLike
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+
+from .engine import FrameResult, InferenceEngine
+from .smoothing import BehaviorFilter
+from .sop_machine import SopMachine
+
+
+class InferenceWorker(QObject):
+    """在工作執行緒中執行推論、繪製與安全判斷，並以平滑後的 Behavior 推進 SOP 狀態機"""
+
+    result_ready = Signal(object)  # FrameResult
+    failed = Signal(str)
+
+    def __init__(self, engine: InferenceEngine, idle: threading.Event, machine: SopMachine | None = None):
+        super().__init__()
+        self.engine = engine
+        self.idle = idle
+        self.machine = machine
+        self.behavior_filter = BehaviorFilter()
+        self.lock = threading.Lock()  # GUI 執行緒重設濾波器或替換狀態機時使用
+
+    @Slot(object, object, bool)
+    def process(self, frames, offsets: dict, smooth: bool):
+        try:
+            result = self.engine.process(frames, offsets)
+            with self.lock:
+                result.smoothed = self.behavior_filter.update(result.behavior) if smooth else result.behavior
+                if self.machine is not None:
+                    result.sop = self.machine.update(result.smoothed, time.monotonic())
+        except Exception as e:
+            self.idle.set()
+            self.failed.emit(str(e))
+            return
+        self.idle.set()
+        self.result_ready.emit(result)
+
+
+class InferencePipeline(QObject):
+    """
+    將畫面送到背景推論執行緒並以 signal 回傳結果.
+
+    推論進行中時，新的畫面會直接被略過（背壓），GUI 執行緒永遠不會等待推論。
+    需要確保被處理的畫面（例如單張圖片）可以用 drop_if_busy=False 排入，只保留最新的一組。
+    跨畫面的平滑與 SOP 狀態機也在推論執行緒中依序更新，結果放在 FrameResult.smoothed 與 FrameResult.sop。
+    """
+
+    result_ready = Signal(object)  # FrameResult
+    _request = Signal(object, object, bool)
+
+    def __init__(self, engine: InferenceEngine, machine: SopMachine | None = None):
+        super().__init__()
+        self.engine = engine
+        self.skipped = 0
+        self._busy = False
+        self._pending = None
+        self._idle = threading.Event()
+        self._idle.set()
+
+        self._thread = QThread()
+        self._thread.setObjectName("inference")
+        self._worker = InferenceWorker(engine, self._idle, machine)
+        self._worker.moveToThread(self._thread)
+        self._request.connect(self._worker.process)
+        self._worker.result_ready.connect(self._on_result)
+        self._worker.failed.connect(self._on_failed)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        return self._busy
+
+    def submit(
+        self,
+        frames: str | MatLike | list[str | MatLike],
+        offsets: dict,
+        drop_if_busy: bool = True,
+        smooth: bool = False,
+    ) -> bool:
+        """送出一組畫面；推論中且 drop_if_busy 時略過並回傳 False。smooth 為是否與之前的畫面一起平滑（影片與攝影機）"""
+        if self._busy:
+            if drop_if_busy:
+                self.skipped += 1
+                return False
+            self._pending = (frames, offsets.copy(), smooth)
+            return True
+        self._dispatch(frames, offsets.copy(), smooth)
+        return True
+
+    def set_machine(self, machine: SopMachine | None):
+        """替換 SOP 狀態機（切換 SOP 或重新載入時）"""
+        with self._worker.lock:
+            self._worker.machine = machine
+
+    def reset_smoothing(self):
+        """切換輸入來源時清除平滑濾波器的歷史"""
+        with self._worker.lock:
+            self._worker.behavior_filter.reset()
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """等待目前的推論結束（供需要在 GUI 執行緒直接使用模型的功能）"""
+        return self._idle.wait(timeout)
+
+    def stop(self):
+        self._pending = None
+        self._thread.quit()
+        self._thread.wait()
+
+    def _dispatch(self, frames, offsets: dict, smooth: bool):
+        self._busy = True
+        self._idle.clear()
+        self._request.emit(frames, offsets, smooth)
+
+    def _dispatch_pending(self):
+        self._busy = False
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            self._dispatch(*pending)
+
+    @Slot(object)
+    def _on_result(self, result: FrameResult):
+        self._dispatch_pending()
+        self.result_ready.emit(result)
+
+    @Slot(str)
+    def _on_failed(self, message: str):
+        print(f"Inference failed: {message}")
+        self._dispatch_pending()
@@ -0,0 +1,19 @@
+import argparse
+
+from ultralytics import YOLO
+
+# 匯出 CPU 部署用的模型，檔名需與 settings.INFERENCE_BACKEND 的讀取規則一致:
+#   onnx     -> pmc5axis11n.onnx、yolo11n-pose.onnx
+#   openvino -> pmc5axis11n_openvino_model/、yolo11n-pose_openvino_model/
+MODELS = [R"pmc5axis11n.pt", R"yolo11n-pose.pt"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--imgsz", type=int, default=640)
+    args = parser.parse_args()
+
+    for path in MODELS:
+        model = YOLO(path)
+        # dynamic batch 讓多台攝影機的畫面可以合成一個批次推論
+        model.export(format=args.format, imgsz=args.imgsz, dynamic=True, simplify=True)
@@ -4,4 +4,12 @@ from .utils import (
     generate_colors,
     calculate_distance,
     calculate_angle,
+    load_images,
+    boxes_to_numpy,
+    Region,
+    RegionSet,
 )
+from .camera import CameraGroup, FrameSet, FrameSetAssembler
+from .annotate import AnnotationRenderer, LabelRegistry, get_registry, get_renderer
+from .display import FrameDisplay
+from .profiler import Profiler, SpanHistogram, profiler
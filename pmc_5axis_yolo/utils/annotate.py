@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from .utils import boxes_to_numpy, generate_colors
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.5
+FONT_THICKNESS = 1
+CONF_BUCKETS = 101  # 置信度顯示到小數第二位: 0.00 ~ 1.00
+
+
+class LabelRegistry:
+    """
+    每個模型的類別顏色與標籤文字表，載入模型時建立一次.
+
+    colors 為 (類別數, 3) 的 NumPy LUT，與 generate_colors 的顏色相同；
+    每個 (類別, 置信度) 的標籤文字與文字大小都已預先計算。
+    """
+
+    def __init__(self, class_names: dict[int, str]):
+        self.class_names = class_names
+        num_classes = max(class_names, default=-1) + 1
+        palette = generate_colors(num_classes)
+        self.colors = np.array([palette[i] for i in range(num_classes)], dtype=np.uint8).reshape(-1, 3)
+        self._color_tuples = [tuple(int(c) for c in color) for color in self.colors]
+        self.names = [class_names.get(i, f"class_{i}") for i in range(num_classes)]
+
+        self.labels = [[f"{name} {bucket / 100:.2f}" for bucket in range(CONF_BUCKETS)] for name in self.names]
+        self.text_sizes = np.zeros((num_classes, CONF_BUCKETS, 2), dtype=np.int32)
+        for class_id, labels in enumerate(self.labels):
+            for bucket, label in enumerate(labels):
+                self.text_sizes[class_id, bucket] = cv2.getTextSize(label, FONT, FONT_SCALE, FONT_THICKNESS)[0]
+        self._text_sizes = self.text_sizes.tolist()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def color(self, class_id: int) -> tuple[int, int, int]:
+        if 0 <= class_id < len(self._color_tuples):
+            return self._color_tuples[class_id]
+        return (255, 255, 255)
+
+    def label(self, class_id: int, bucket: int) -> tuple[str, int, int]:
+        """取得 (文字, 寬, 高)，bucket 為置信度 * 100"""
+        if 0 <= class_id < len(self.labels) and 0 <= bucket < CONF_BUCKETS:
+            text_width, text_height = self._text_sizes[class_id][bucket]
+            return self.labels[class_id][bucket], text_width, text_height
+        label = f"class_{class_id} {bucket / 100:.2f}"
+        (text_width, text_height), _ = cv2.getTextSize(label, FONT, FONT_SCALE, FONT_THICKNESS)
+        return label, text_width, text_height
+
+
+class AnnotationRenderer:
+    """
+    將物件偵測框繪製到畫面上.
+
+    所有偵測框一次轉成 NumPy 陣列，不再逐一存取 tensor；
+    顏色與文字從 LabelRegistry 查表，並直接畫在傳入的畫面上（不複製）。
+    """
+
+    def __init__(self, registry: LabelRegistry):
+        self.registry = registry
+
+    def draw(self, frame: MatLike, object_result: Results) -> MatLike:
+        """在 frame 上直接繪製 object_result 的所有偵測框並回傳 frame"""
+        data = boxes_to_numpy(object_result)
+        if not len(data):
+            return frame
+
+        xyxy = data[:, :4].astype(np.int32)
+        buckets = np.rint(data[:, 4] * 100).astype(np.int32)
+        class_ids = data[:, 5].astype(np.int32)
+
+        for (x1, y1, x2, y2), class_id, bucket in zip(xyxy.tolist(), class_ids.tolist(), buckets.tolist()):
+            color = self.registry.color(class_id)
+            label, text_width, text_height = self.registry.label(class_id, bucket)
+
+            # 調整文字背景的位置以避免超出影像範圍
+            text_y1 = y1 - text_height - 4 if y1 - text_height - 4 > 0 else y1
+
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            cv2.rectangle(frame, (x1, text_y1), (x1 + text_width, text_y1 + text_height + 4), color, -1)
+            cv2.putText(frame, label, (x1, text_y1 + text_height + 2), FONT, FONT_SCALE, (255, 255, 255), FONT_THICKNESS)
+
+        return frame
+
+
+@lru_cache(maxsize=8)
+def _registry(names: tuple[tuple[int, str], ...]) -> LabelRegistry:
+    return LabelRegistry(dict(names))
+
+
+def get_registry(class_names: dict[int, str]) -> LabelRegistry:
+    """同一組類別名稱（同一個模型）只建立一次 LabelRegistry"""
+    return _registry(tuple(class_names.items()))
+
+
+def get_renderer(class_names: dict[int, str]) -> AnnotationRenderer:
+    return AnnotationRenderer(get_registry(class_names))
@@ -1,8 +1,297 @@
 import os
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import datetime
 
 import cv2
 import numpy as np
+from cv2.typing import MatLike
+
+from ..settings import SYNC_BUFFER, SYNC_POLICY, SYNC_TOLERANCE_MS
+
+
+class LatestFrameBuffer:
+    """只保留最新幾張畫面的環狀緩衝區，寫滿時自動丟棄最舊的畫面"""
+
+    def __init__(self, size: int = 2):
+        self._frames = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._last_read_id = -1
+        self.dropped = 0  # 從未被取用就被覆蓋的畫面數
+
+    def put(self, frame: MatLike, timestamp: float):
+        with self._lock:
+            self._frames.append((self._next_id, timestamp, frame))
+            self._next_id += 1
+
+    def latest(self) -> tuple[int, float, MatLike] | None:
+        """取得最新的畫面 (frame_id, timestamp, frame)，不會阻塞"""
+        with self._lock:
+            if not self._frames:
+                return None
+            item = self._frames[-1]
+            if item[0] > self._last_read_id:
+                self.dropped += item[0] - self._last_read_id - 1
+                self._last_read_id = item[0]
+            return item
+
+    def snapshot(self) -> list[tuple[int, float, MatLike]]:
+        """緩衝區中所有畫面 (frame_id, timestamp, frame)，由舊到新"""
+        with self._lock:
+            return list(self._frames)
+
+    def mark_read(self, frame_id: int):
+        """記錄已被取用的畫面，在它之前且從未被取用的畫面計為丟棄"""
+        with self._lock:
+            if frame_id > self._last_read_id:
+                self.dropped += frame_id - self._last_read_id - 1
+                self._last_read_id = frame_id
+
+
+class CameraGrabber(threading.Thread):
+    """在背景執行緒持續讀取單一攝影機，將畫面寫入 LatestFrameBuffer"""
+
+    MAX_FAILURES = 30  # 連續讀取失敗次數上限，超過視為攝影機中斷
+
+    def __init__(
+        self,
+        index: int,
+        width: int = 640,
+        height: int = 480,
+        buffer_size: int = SYNC_BUFFER,
+        on_frame: Callable[[int, MatLike, float], None] | None = None,
+    ):
+        super().__init__(name=f"camera-{index}", daemon=True)
+        self.index = index
+        self.cap = cv2.VideoCapture(index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.buffer = LatestFrameBuffer(buffer_size)
+        self.on_frame = on_frame  # 每張畫面都會呼叫 (index, frame, timestamp)，例如交給錄影的編碼執行緒
+        self.frames = 0
+        self.fps = 0.0
+        self._stop_event = threading.Event()
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def get(self, prop: int) -> float:
+        return self.cap.get(prop)
+
+    def run(self):
+        failures = 0
+        last_time = None
+        while not self._stop_event.is_set() and failures < self.MAX_FAILURES:
+            # grab() 回傳時畫面已由驅動取得，在解碼 (retrieve) 之前蓋時間戳，解碼時間不會算進畫面時間
+            ret = self.cap.grab()
+            timestamp = time.monotonic()
+            if ret:
+                ret, frame = self.cap.retrieve()
+            if not ret:
+                failures += 1
+                time.sleep(0.01)
+                continue
+            failures = 0
+            self.buffer.put(frame, timestamp)
+            if self.on_frame is not None:
+                self.on_frame(self.index, frame, timestamp)
+            self.frames += 1
+
+            # 以指數移動平均估計實際擷取 FPS
+            if last_time is not None and timestamp > last_time:
+                instant_fps = 1 / (timestamp - last_time)
+                self.fps = instant_fps if self.fps == 0 else 0.9 * self.fps + 0.1 * instant_fps
+            last_time = timestamp
+        if failures >= self.MAX_FAILURES:
+            print(f"Camera {self.index} stopped: too many read failures.")
+
+    def iter_frames(self, count: int, timeout: float = 10.0):
+        """依序產生接下來的 count 張新畫面（例如偏移值校正），逾時就停止"""
+        deadline = time.monotonic() + timeout
+        last_id = -1
+        produced = 0
+        while produced < count and time.monotonic() < deadline and self.is_alive():
+            snapshot = self.buffer.snapshot()
+            if not snapshot or snapshot[-1][0] == last_id:
+                time.sleep(0.005)
+                continue
+            last_id, _, frame = snapshot[-1]
+            produced += 1
+            yield frame
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=1)
+        self.cap.release()
+
+
+@dataclass
+class FrameSet:
+    """同一時刻的多攝影機畫面"""
+
+    frames: list[MatLike]
+    timestamps: list[float]  # time.monotonic()，interpolate 時為兩張畫面的插值時間
+    skew: float  # 最早與最晚畫面的時間差 (秒)
+    age: float  # 組合時最舊的畫面已經過的時間 (秒)
+    interpolated: bool = False
+
+
+class FrameSetAssembler:
+    """
+    依擷取時間戳將各攝影機的畫面組成同一時刻的一組畫面.
+
+    以所有攝影機最新畫面中最舊的時間為目標時間，每台攝影機從緩衝區中挑選最接近的畫面；
+    時間差超過 tolerance 時依 policy 丟棄 ("drop")，或以目標時間前後兩張畫面線性插值 ("interpolate")。
+    時間差統計記錄的是處理前的原始時間差，包括被丟棄或插值的組。
+    """
+
+    def __init__(self, tolerance_ms: float = SYNC_TOLERANCE_MS, policy: str = SYNC_POLICY, history: int = 300):
+        if policy not in ("drop", "interpolate"):
+            raise ValueError(f"Unknown sync policy: {policy}")
+        self.tolerance = tolerance_ms / 1000
+        self.policy = policy
+        self.skews = deque(maxlen=history)
+        self.assembled = 0
+        self.dropped = 0
+        self.interpolated = 0
+        self.last_skew = 0.0  # 最近一組（包括被丟棄的組）的原始時間差 (秒)
+        self._last_target = None
+
+    def assemble(self, grabbers: list[CameraGrabber]) -> FrameSet | None:
+        snapshots = [grabber.buffer.snapshot() for grabber in grabbers]
+        if not snapshots or not all(snapshots):
+            return None
+
+        target = min(snapshot[-1][1] for snapshot in snapshots)
+        if target == self._last_target:
+            return None  # 最慢的攝影機還沒有新畫面，避免重複送出同一組
+        self._last_target = target
+
+        chosen = [min(snapshot, key=lambda item: abs(item[1] - target)) for snapshot in snapshots]
+        timestamps = [item[1] for item in chosen]
+        skew = max(timestamps) - min(timestamps)
+        frames = [item[2] for item in chosen]
+        interpolated = False
+        # 在丟棄 / 插值之前記錄，統計才能反映實際的時間差
+        self.skews.append(skew)
+        self.last_skew = skew
+
+        if skew > self.tolerance:
+            if self.policy == "drop":
+                self.dropped += 1
+                return None
+            frames, timestamps = self._interpolate(snapshots, chosen, target)
+            if frames is None:
+                self.dropped += 1
+                return None
+            skew = 0.0
+            interpolated = True
+            self.interpolated += 1
+
+        for grabber, (frame_id, _, _) in zip(grabbers, chosen):
+            grabber.buffer.mark_read(frame_id)
+        self.assembled += 1
+        return FrameSet(frames, timestamps, skew, time.monotonic() - min(timestamps), interpolated)
+
+    def _interpolate(self, snapshots, chosen, target: float):
+        """時間差過大的攝影機以 target 前後兩張畫面混合，緩衝區中沒有前後畫面時放棄"""
+        frames, timestamps = [], []
+        for snapshot, item in zip(snapshots, chosen):
+            if abs(item[1] - target) <= self.tolerance:
+                frames.append(item[2])
+                timestamps.append(item[1])
+                continue
+            before = [entry for entry in snapshot if entry[1] <= target]
+            after = [entry for entry in snapshot if entry[1] >= target]
+            if not before or not after:
+                return None, None
+            (_, t0, f0), (_, t1, f1) = before[-1], after[0]
+            weight = (target - t0) / (t1 - t0) if t1 > t0 else 0.0
+            frames.append(cv2.addWeighted(f0, 1 - weight, f1, weight, 0))
+            timestamps.append(target)
+        return frames, timestamps
+
+    def stats(self) -> dict:
+        """時間差統計 (毫秒) 與組合 / 丟棄 / 插值次數"""
+        skews = np.array(self.skews) * 1000 if self.skews else np.zeros(1)
+        return {
+            "assembled": self.assembled,
+            "dropped": self.dropped,
+            "interpolated": self.interpolated,
+            "skew_mean_ms": float(skews.mean()),
+            "skew_p95_ms": float(np.percentile(skews, 95)),
+            "skew_max_ms": float(skews.max()),
+        }
+
+
+class CameraGroup:
+    """管理多台攝影機的背景擷取，計時器只需取得最新的一組畫面"""
+
+    def __init__(
+        self,
+        count: int,
+        width: int = 640,
+        height: int = 480,
+        buffer_size: int = SYNC_BUFFER,
+        on_frame: Callable[[int, MatLike, float], None] | None = None,
+        indices: list[int] | None = None,
+    ):
+        # indices: 依序開啟的攝影機編號（例如設定檔的攝影機順序），預設為 0 ~ count-1
+        self.grabbers: list[CameraGrabber] = []
+        for i in indices if indices is not None else range(count):
+            print(f"Turning on camera {i}...")
+            grabber = CameraGrabber(i, width, height, buffer_size, on_frame)
+            if not grabber.isOpened():
+                print(f"Camera {i} did not turn on.")
+                grabber.cap.release()
+                continue
+            print(
+                f"Camera {i} is on. Resolution: {grabber.get(cv2.CAP_PROP_FRAME_WIDTH)}x{grabber.get(cv2.CAP_PROP_FRAME_HEIGHT)}"
+            )
+            grabber.start()
+            self.grabbers.append(grabber)
+        self.assembler = FrameSetAssembler()
+
+    def __len__(self) -> int:
+        return len(self.grabbers)
+
+    def __getitem__(self, idx: int) -> CameraGrabber:
+        return self.grabbers[idx]
+
+    def is_alive(self) -> bool:
+        """主攝影機 (0 號) 是否仍在擷取"""
+        return bool(self.grabbers) and self.grabbers[0].is_alive()
+
+    def read(self) -> list[MatLike] | None:
+        """取得每台攝影機最新的畫面；任一台尚未有畫面時回傳 None"""
+        frames = []
+        for grabber in self.grabbers:
+            item = grabber.buffer.latest()
+            if item is None:
+                return None
+            frames.append(item[2])
+        return frames
+
+    def read_synced(self) -> "FrameSet | None":
+        """由 FrameSetAssembler 取得時間對齊的一組畫面；無法在容許誤差內對齊時回傳 None"""
+        return self.assembler.assemble(self.grabbers)
+
+    def stats(self) -> list[dict]:
+        """每台攝影機的擷取 FPS 與丟棄畫面數"""
+        return [
+            {"camera": g.index, "fps": g.fps, "frames": g.frames, "dropped": g.buffer.dropped} for g in self.grabbers
+        ]
+
+    def release(self):
+        for grabber in self.grabbers:
+            grabber.stop()
+        self.grabbers = []
 
 
 def test_camera_num():
@@ -48,6 +337,67 @@ def test_camera_num():
     cv2.destroyAllWindows()
 
 
+class AsyncVideoWriter(threading.Thread):
+    """
+    單一攝影機的編碼執行緒.
+
+    擷取執行緒只把畫面放進有上限的 queue，編碼在這條執行緒進行，不會拖慢其他攝影機的擷取；
+    queue 滿時丟棄畫面並計數。每張寫入的畫面都會在 <檔名>.csv 記錄擷取時間，供多攝影機畫面重新對齊。
+    """
+
+    def __init__(self, filename: str, fps: float = 30.0, queue_size: int = 120):
+        super().__init__(name=f"writer-{os.path.basename(filename)}", daemon=True)
+        self.filename = filename
+        self.fps = fps
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._out = None
+        self._sidecar = open(f"{os.path.splitext(filename)[0]}.csv", "w", encoding="utf-8")
+        self._sidecar.write("frame,monotonic,wall_time\n")
+
+    def write(self, frame: MatLike, timestamp: float) -> bool:
+        """由擷取執行緒呼叫，不會阻塞；queue 已滿時丟棄並回傳 False"""
+        try:
+            self.queue.put_nowait((frame, timestamp, time.time()))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame, timestamp, wall_time = item
+            if self._out is None:
+                # 以第一張畫面的實際解析度建立檔案
+                height, width = frame.shape[:2]
+                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                self._out = cv2.VideoWriter(self.filename, fourcc, self.fps, (width, height))
+            self._out.write(frame)
+            self._sidecar.write(f"{self.written},{timestamp:.6f},{wall_time:.6f}\n")
+            self.written += 1
+
+    def close(self):
+        self.queue.put(None)  # 寫完 queue 中剩下的畫面後結束
+        self.join()
+        if self._out is not None:
+            self._out.release()
+        self._sidecar.close()
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+        }
+
+
 def record_with_multiple_camera():
     nums = int(input("Enter the number of cameras: "))
     # 取得目前時間作為檔案名稱的一部分
@@ -56,51 +406,51 @@ def record_with_multiple_camera():
     parent = os.path.join("captured_images", "videos")
     os.makedirs(parent, exist_ok=True)
 
-    # 設定每個鏡頭的輸出檔名
-    filenames = [os.path.join(parent, f"cam_{i}_{current_time}.mp4") for i in range(nums)]
+    writers: dict[int, AsyncVideoWriter] = {}
 
-    caps = []
-    outs = []
+    def on_frame(index: int, frame: MatLike, timestamp: float):
+        writer = writers.get(index)  # 編碼執行緒建立前擷取到的畫面直接略過
+        if writer is not None:
+            writer.write(frame, timestamp)
 
-    for index, filename in enumerate(filenames):
-        # 打開攝影機
-        cap = cv2.VideoCapture(index)
+    # 每台攝影機一條擷取執行緒，每張畫面都交給對應的編碼執行緒
+    cameras = CameraGroup(nums, 1280, 720, on_frame=on_frame)
+    if not len(cameras):
+        print("No camera turned on.")
+        return
 
-        # 設定攝影機的解析度
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    # 只為成功開啟的攝影機設定輸出檔名，每台攝影機一條編碼執行緒
+    for grabber in cameras.grabbers:
+        writer = AsyncVideoWriter(os.path.join(parent, f"cam_{grabber.index}_{current_time}.mp4"), 30.0)
+        writer.start()
+        writers[grabber.index] = writer
 
-        # 定義編碼方式和輸出檔案格式
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        out = cv2.VideoWriter(filename, fourcc, 30.0, (1280, 720))
-        caps.append(cap)
-        outs.append(out)
+    last_report = time.monotonic()
+    while cameras.is_alive():
+        frames = cameras.read()
+        if frames is not None:
+            combined_frame = cv2.resize(np.hstack(frames), (0, 0), fx=0.5, fy=0.5)
+            # 顯示影像
+            cv2.imshow(f"Recording...", combined_frame)
 
-    while True:
-        frames = []
-        for index, (cap, out) in enumerate(zip(caps, outs)):
-            ret, frame = cap.read()
-            if not ret:
-                print(f"無法從攝影機 {index} 讀取影像")
-                break
-
-            # 寫入影像到檔案
-            out.write(frame)
-
-            frames.append(frame)
-
-        combined_frame = cv2.resize(np.hstack(frames), (0, 0), fx=0.5, fy=0.5)
-        # 顯示影像
-        cv2.imshow(f"Recording...", combined_frame)
+        if time.monotonic() - last_report > 5:
+            for stat in cameras.stats():
+                writer_stat = writers[stat["camera"]].stats()
+                print(
+                    f"Camera {stat['camera']}: {stat['fps']:.1f} FPS, written {writer_stat['written']}, "
+                    f"queue {writer_stat['depth']} (max {writer_stat['max_depth']}), dropped {writer_stat['dropped']}"
+                )
+            last_report = time.monotonic()
 
         # 按 'q' 鍵退出錄影
         if cv2.waitKey(1) & 0xFF == ord("q"):
             break
 
     # 釋放資源
-    for cap, out in zip(caps, outs):
-        cap.release()
-        out.release()
+    cameras.release()
+    for index, writer in writers.items():
+        writer.close()
+        print(f"Camera {index}: {writer.stats()}")
     cv2.destroyAllWindows()
 
     print("錄影結束")
@@ -0,0 +1,39 @@
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtWidgets import QLabel
+
+from .profiler import profiler
+from .utils import convert2QImage
+
+
+class FrameDisplay:
+    """
+    將畫面顯示到固定大小的 QLabel.
+
+    每個 label 保留一塊預先配置的 BGR 緩衝區，畫面以 cv2.resize 直接縮放進緩衝區，
+    再以 Format_BGR888 包裝成 QImage，Qt 不需要再縮放大張的 pixmap。
+    QPixmap.fromImage 會複製資料，所以緩衝區可以在下一張畫面重複使用。
+    """
+
+    def __init__(self, label: QLabel):
+        self.label = label
+        self._buffer = None
+
+    def show(self, frame: MatLike):
+        width, height = self.label.width(), self.label.height()
+        if width <= 0 or height <= 0:
+            with profiler.span("qimage"):
+                pixmap = QPixmap.fromImage(convert2QImage(frame))
+            self.label.setPixmap(pixmap)
+            return
+
+        with profiler.span("qimage"):
+            if self._buffer is None or self._buffer.shape[:2] != (height, width):
+                self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+            cv2.resize(frame, (width, height), dst=self._buffer, interpolation=cv2.INTER_AREA)
+
+            image = QImage(self._buffer.data, width, height, self._buffer.strides[0], QImage.Format.Format_BGR888)
+            pixmap = QPixmap.fromImage(image)
+        self.label.setPixmap(pixmap)
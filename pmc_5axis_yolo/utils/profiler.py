@@ -0,0 +1,93 @@
+import csv
+import itertools
+import time
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+from ..settings import PROFILE_WINDOW, PROFILING
+
+
+class SpanHistogram:
+    """
+    固定大小的環狀耗時紀錄 (毫秒).
+
+    寫入只有取號與一次陣列指派，不使用鎖；itertools.count 的 next() 在 GIL 下是原子操作，
+    多條執行緒同時寫入同一個 span 也不會拿到相同的位置。讀取時複製一份再計算百分位數。
+    """
+
+    def __init__(self, size: int = PROFILE_WINDOW):
+        self.size = size
+        self._values = np.zeros(size, dtype=np.float64)
+        self._counter = itertools.count()
+        self.count = 0
+
+    def add(self, ms: float):
+        idx = next(self._counter)
+        self._values[idx % self.size] = ms
+        self.count = idx + 1
+
+    def values(self) -> np.ndarray:
+        return self._values[: min(self.count, self.size)].copy()
+
+    def percentiles(self) -> dict:
+        values = self.values()
+        if not len(values):
+            return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"count": self.count, "mean": float(values.mean()), "p50": p50, "p95": p95, "p99": p99}
+
+
+class Profiler:
+    """以名稱記錄各階段的耗時；停用時 span() 幾乎沒有額外成本"""
+
+    def __init__(self, enabled: bool = PROFILING, window: int = PROFILE_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.spans: dict[str, SpanHistogram] = {}
+
+    def record(self, name: str, seconds: float):
+        histogram = self.spans.get(name)
+        if histogram is None:
+            histogram = self.spans.setdefault(name, SpanHistogram(self.window))
+        histogram.add(seconds * 1000)
+
+    def span(self, name: str):
+        """with profiler.span("pose"): ...，記錄區塊的執行時間"""
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name: str):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - begin)
+
+    def summary(self) -> dict[str, dict]:
+        return {name: histogram.percentiles() for name, histogram in list(self.spans.items())}
+
+    def format(self) -> str:
+        """單行摘要，供狀態列顯示"""
+        return " | ".join(
+            f"{name} {stats['p50']:.1f}/{stats['p95']:.1f}/{stats['p99']:.1f}" for name, stats in self.summary().items()
+        )
+
+    def dump_csv(self, path: str):
+        """輸出每個 span 的次數、平均與 p50/p95/p99 (毫秒)"""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["span", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+            for name, stats in self.summary().items():
+                writer.writerow(
+                    [name, stats["count"]] + [f"{stats[key]:.3f}" for key in ("mean", "p50", "p95", "p99")]
+                )
+
+    def reset(self):
+        self.spans = {}
+
+
+# 全域的 profiler，由 settings.PROFILING 控制是否啟用
+profiler = Profiler()
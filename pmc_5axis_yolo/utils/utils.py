@@ -1,29 +1,55 @@
+from __future__ import annotations
+
 import random
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 import cv2
 import numpy as np
 from cv2.typing import MatLike
 from PySide6.QtGui import QImage
-from ultralytics.engine.results import Results
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
 
 
 def convert2QImage(img: MatLike) -> QImage:
-    height, width, channel = img.shape
-    bytes_per_line = width * channel
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    return QImage(img.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
+    """
+    直接以 BGR888 格式包裝 OpenCV 畫面，不轉色也不複製.
+
+    回傳的 QImage 與 img 共用記憶體，並保留對 img 的參考，避免陣列先被回收。
+    """
+    img = np.ascontiguousarray(img)
+    height, width, _ = img.shape
+    image = QImage(img.data, width, height, img.strides[0], QImage.Format.Format_BGR888)
+    image.ndarray = img  # lifetime guard
+    return image
+
+
+def load_images(image: str | MatLike | list[str | MatLike]) -> list[MatLike]:
+    """將輸入整理成影像陣列的 list，讓模型以單一批次張量推論"""
+    images = image if isinstance(image, list) else [image]
+    batch = []
+    for item in images:
+        if isinstance(item, str):
+            frame = cv2.imread(item)
+            if frame is None:
+                raise ValueError(f"無法讀取影像：{item}")
+            batch.append(frame)
+        else:
+            batch.append(item)
+    return batch
 
 
 def generate_colors(num_classes):
     """生成隨機顏色"""
-    random.seed(42)  # 設定隨機種子以確保顏色一致
+    rng = random.Random(42)  # 固定種子以確保顏色一致，且不影響全域 random 的狀態
     colors = {}
     for i in range(num_classes):
         colors[i] = (
-            random.randint(0, 255),
-            random.randint(0, 255),
-            random.randint(0, 255),
+            rng.randint(0, 255),
+            rng.randint(0, 255),
+            rng.randint(0, 255),
         )
     return colors
 
@@ -43,32 +69,75 @@ def calculate_angle(A, B, C):
     return np.degrees(angle)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Region:
     x_min: int
     x_max: int
     y_min: int
     y_max: int
+    conf: float = 1.0
 
 
-def extract_object_regions(
-    object_result: Results, target_classes: list[str]
-) -> dict[str, Region]:
-    """從物件偵測結果中提取指定類別的範圍（bounding boxes）."""
-    regions = {class_name: None for class_name in target_classes}
+class RegionSet:
+    """同一類別的所有偵測框，以 NumPy 陣列保存 (boxes: x_min, y_min, x_max, y_max)"""
+
+    __slots__ = ("boxes", "conf")
+
+    def __init__(self, boxes: np.ndarray, conf: np.ndarray):
+        self.boxes = boxes
+        self.conf = conf
 
-    for detection in object_result.boxes:
-        # 獲取偵測框的座標
-        x1, y1, x2, y2 = map(int, detection.xyxy[0].tolist())
+    def __len__(self) -> int:
+        return len(self.conf)
 
-        # 獲取物件的類別編號
-        class_id = int(detection.cls[0])
+    def __getitem__(self, idx: int) -> Region:
+        x1, y1, x2, y2 = self.boxes[idx].tolist()
+        return Region(x1, x2, y1, y2, float(self.conf[idx]))
 
-        # 獲取物件的類別名稱
-        class_name = object_result.names[class_id]
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
 
-        # 如果類別名稱符合目標類別，記錄其範圍
-        if class_name in target_classes:
-            regions[class_name] = Region(x1, x2, y1, y2)
+    def best(self) -> Region | None:
+        """置信度最高的範圍"""
+        return self[int(self.conf.argmax())] if len(self) else None
+
+
+def boxes_to_numpy(object_result: Results) -> np.ndarray:
+    """一次取出所有偵測框 (N, 6): x1, y1, x2, y2, conf, cls"""
+    boxes = object_result.boxes
+    if boxes is None:
+        return np.zeros((0, 6), dtype=np.float32)
+    data = boxes.data
+    return data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+
+
+def extract_object_regions(
+    object_result: Results, target_classes: list[str], all_regions: bool = False
+) -> dict[str, Region | None] | dict[str, RegionSet]:
+    """
+    從物件偵測結果中提取指定類別的範圍（bounding boxes）.
+
+    預設每個類別只回傳置信度最高的 Region（沒有偵測到則為 None）；
+    all_regions=True 時回傳每個類別的 RegionSet（依置信度由高到低排序）。
+    """
+    data = boxes_to_numpy(object_result)
+    class_ids = {name: class_id for class_id, name in object_result.names.items()}
+
+    xyxy = data[:, :4].astype(np.int32)
+    conf = data[:, 4]
+    cls = data[:, 5].astype(np.int32)
+
+    regions = {}
+    for class_name in target_classes:
+        mask = cls == class_ids.get(class_name, -1)
+        if all_regions:
+            order = np.argsort(-conf[mask], kind="stable")
+            regions[class_name] = RegionSet(xyxy[mask][order], conf[mask][order])
+        elif mask.any():
+            idx = np.flatnonzero(mask)[conf[mask].argmax()]
+            x1, y1, x2, y2 = xyxy[idx].tolist()
+            regions[class_name] = Region(x1, x2, y1, y2, float(conf[idx]))
+        else:
+            regions[class_name] = None
 
     return regions
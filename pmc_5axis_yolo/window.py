@@ -5,24 +5,51 @@ import winsound
 import cv2
 from cv2.typing import MatLike
 from PySide6.QtCore import Qt, QTimer, Signal
-from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtGui import QKeySequence, QPixmap, QShortcut
 from PySide6.QtWidgets import (
     QApplication,
     QDialog,
-    QDialogButtonBox,
     QFileDialog,
     QLabel,
     QMainWindow,
-    QVBoxLayout,
-    QWidget,
+    QMessageBox,
+    QProgressBar,
 )
-from ultralytics import YOLO
 
-from .settings import CAMERA_COUNT, DEFAULT_OFFSETS, OBJECT_MODEL, POSE_MODEL
-from .tasks import OffsetSlider, adj_offsets, predict_result
+from .settings import (
+    CALIBRATION_FRAMES,
+    CAMERA_COUNT,
+    DEFAULT_OFFSETS,
+    OBJECT_CONF,
+    OBJECT_MODEL,
+    POSE_MODEL,
+    SOP_LANGUAGE,
+    SOP_NAME,
+    SOP_RELOAD_INTERVAL,
+)
+from .tasks import (
+    AdaptiveScheduler,
+    FrameResult,
+    InferenceEngine,
+    InferencePipeline,
+    ModelLoader,
+    OffsetSlider,
+    Profile,
+    SopLibrary,
+    adj_offsets,
+    calibrate,
+    draw_offset_preview,
+    iter_clip_frames,
+    load_machine,
+    load_profile,
+    machine_id,
+    reference_points,
+    save_profile,
+    validate_profile,
+)
 from .ui.ask_offset_ui import Ui_Dialog
 from .ui.main_window_ui import Ui_MainWindow
-from .utils import convert2QImage
+from .utils import CameraGroup, FrameDisplay, Region, profiler
 
 
 class AskInitOffset(QDialog):
@@ -51,23 +78,56 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def __init__(self):
         super(MainWindow, self).__init__()
         self.setupUi(self)
-        self.pose_model = YOLO(POSE_MODEL)
-        self.object_model = YOLO(OBJECT_MODEL)
+        # 模型在背景執行緒載入與預熱，視窗先顯示；需要模型的操作由 models_ready() 等待
+        self.pose_model = None
+        self.object_model = None
+        self.engine = None
+        self.pipeline = None
+        self.model_progress = QProgressBar()
+        self.model_progress.setMaximumWidth(200)
+        self.statusBar().addPermanentWidget(self.model_progress)
+        self.model_loader = ModelLoader(POSE_MODEL, OBJECT_MODEL)
+        self.model_loader.progress.connect(self.on_model_progress)
+        self.model_loader.loaded.connect(self.models_ready)
+        self.model_loader.failed.connect(self.on_model_failed)
+        self.model_loader.start()
+        self.smooth_behavior = False  # 單張圖片不需要跨畫面平滑，平滑由推論執行緒處理
+        self.scheduler = AdaptiveScheduler(30)
+        self.last_result = None
         self.offsets = DEFAULT_OFFSETS.copy()
+        # 設定檔存在時直接套用，開啟攝影機時再以一張畫面檢查是否需要重新校正
+        self.profile = load_profile()
+        self.profile_check_pending = False
+        if self.profile is not None:
+            self.offsets = self.profile.offsets.copy()
+            print(f"Loaded profile for {self.profile.machine} (saved {self.profile.saved_at}).")
+        self.offset_preview = False  # 偏移值滑桿開啟時在畫面上標出調整後的手腕位置
 
         self.video_timer = QTimer()
         self.camera_timer = QTimer()
         self.timers = [self.video_timer, self.camera_timer]
         for timer in self.timers:
             timer.setInterval(1000)
+
+        # 各階段耗時 p50/p95/p99 (ms)，settings.PROFILING 開啟時每秒更新
+        self.profile_label = QLabel()
+        self.profile_label.setVisible(profiler.enabled)
+        self.statusBar().addPermanentWidget(self.profile_label)
+        self.profile_timer = QTimer()
+        self.profile_timer.setInterval(1000)
+        if profiler.enabled:
+            self.profile_timer.start()
         self.video = None
+        self.cameras = None
+        self.sync_dropped = 0  # 預覽已處理過的丟棄組數
         # self.video2 = None
         self.camera_on = 0
 
         self.dialog = None
         self.aspect_ratio = 16 / 9
         self.bind_slots()
-        self.ask_for_offsets()
+        if self.profile is None:
+            QTimer.singleShot(0, self.ask_for_offsets)  # 等視窗顯示後再詢問
         self.Label_HandStop_Status.setText("Hand on Stop: N/A")
         self.Label_HandFeed_Status.setText("Hand on Feed: N/A")
         self.Label_KnifeBaseCollid_status.setText("Knife Base Collided: N/A")
@@ -78,12 +138,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.outputratio = 0.75
 
         self.now_step = 1
-        self.sop_start = False
-        self.steps_file = "texts/SOP_step.txt"
-        self.steps_table = "texts/steps_table.txt"
-        self.steps_totals = self.get_step_count()
-        self.init_step_label()
-        self.update_step_label()
+        self.sop_machine = None
+        # SOP 文件一次讀入記憶體，切換步驟不讀檔；計時器檢查檔案修改時間以重新載入
+        self.sop_library = SopLibrary()
+        self.select_sop(SOP_NAME, SOP_LANGUAGE)
+        self.sop_timer = QTimer()
+        self.sop_timer.timeout.connect(self.reload_sop)
+        self.sop_timer.start(SOP_RELOAD_INTERVAL)
 
         self.target_folder = "captured_images"
         os.makedirs(self.target_folder, exist_ok=True)
@@ -131,6 +192,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.output_media,
             self.output_media2,
         ]
+        self.displays = {label: FrameDisplay(label) for label in self.labels}
 
         self.camera_change_button = [
             self.camera_change1,
@@ -142,13 +204,45 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.adjustmode_switch()
 
     # ~~~~~~~~~~~~~~~~~~~~~~step labelr~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def select_sop(self, name: str, language: str | None = None):
+        """切換 SOP 或語言；已讀取過的文件由 SopLibrary 快取"""
+        self.sop_name = name
+        self.sop = self.sop_library.get(name, language)
+        self.refresh_sop()
+
+    def reload_sop(self):
+        if self.sop.reload_if_changed():
+            self.refresh_sop()
+
+    def refresh_sop(self):
+        """文件（重新）載入後更新步驟標籤，並重新讀取同資料夾的 SOP 狀態機"""
+        self.steps_totals = len(self.sop)
+        self.now_step = min(self.now_step, max(1, self.steps_totals))
+        try:
+            self.sop_machine = load_machine(self.sop.folder)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Invalid SOP state machine in {self.sop.folder}: {e}")
+            self.sop_machine = None
+        if self.sop_machine is not None:
+            self.sop_machine.jump(self.now_step)
+        if self.pipeline is not None:
+            self.pipeline.set_machine(self.sop_machine)
+        self.init_step_label()
+        self.update_step_label()
+
+    def next_sop_language(self):
+        languages = [None] + self.sop.languages()
+        # 目前的語言沒有翻譯檔（例如 SOP_LANGUAGE 設定的語言）時從預設語言開始
+        current = languages.index(self.sop.language) if self.sop.language in languages else -1
+        language = languages[(current + 1) % len(languages)]
+        self.select_sop(self.sop_name, language)
+        print(f"SOP language: {language or 'default'}")
+
     def init_step_label(self):
         step_descriptions = [
-            (self.get_step_description(self.now_step) if self.now_step > 0 else "N/A"),  # 上一步骤
-            self.get_step_description(self.now_step + 1),  # 当前步骤
-            (
-                self.get_step_description(self.now_step + 2) if self.now_step < self.steps_totals + 1 else "N/A"
-            ),  # 下一步骤
+            (self.sop.title(self.now_step) if self.now_step > 0 else "N/A"),  # 上一步骤
+            self.sop.title(self.now_step + 1),  # 当前步骤
+            (self.sop.title(self.now_step + 2) if self.now_step < self.steps_totals + 1 else "N/A"),  # 下一步骤
         ]
 
         self.label_step_last.setText(f"{step_descriptions[0]}")
@@ -156,7 +250,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.label_step_next.setText(f"{step_descriptions[2]}")
 
     def update_step_label(self):
-        self.load_step_text(self.now_step)
+        self.label_ste_text.setText(self.sop.text(self.now_step))
         self.label_step_last.setStyleSheet("color: rgba(255, 255, 255, 128);")
         self.label_step_now.setStyleSheet("color: rgba(255, 255, 255, 128);")
         self.label_step_next.setStyleSheet("color: rgba(255, 255, 255, 128);")
@@ -167,51 +261,49 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         elif self.now_step == 3:
             self.label_step_next.setStyleSheet("color: rgba(255, 255, 255, 255);")
 
-    def get_step_description(self, step_number):
-        try:
-            with open(self.steps_file, "r", encoding="utf-8") as file:
-                steps = file.readlines()
-                if 0 < step_number <= len(steps):
-                    return steps[step_number - 1].strip()
-                else:
-                    return "N/A"
-        except FileNotFoundError:
-            return "FileOpenError1"
-
-    def get_step_text(self, step_number):
-        try:
-            with open(self.steps_table, "r", encoding="utf-8") as file:
-                steps = file.readlines()
-                if 0 < step_number <= len(steps):
-                    return steps[step_number - 1].strip()
-                else:
-                    return "N/A"
-        except FileNotFoundError:
-            return "FileOpenError2"
-
-    def load_step_text(self, step_number):
-        step_file_name = self.get_step_text(step_number)
-        try:
-            with open(step_file_name, "r", encoding="utf-8") as file:
-                step_content = file.read().strip()  # 读取文件内容，移除首尾空白
-                self.label_ste_text.setText(step_content)
-        except FileNotFoundError:
-            return "FileOpenError3"
-
     def step_ToNext(self):
         if self.now_step < self.steps_totals:
             self.now_step += 1
             self.update_step_label()
+            if self.sop_machine is not None:
+                self.sop_machine.jump(self.now_step)
 
     def step_ToPrevious(self):
         if self.now_step > 1:
             self.now_step -= 1
             self.update_step_label()
-
-    def get_step_count(self):
-        with open(self.steps_file, "r", encoding="utf-8") as file:
-            steps = file.readlines()
-        return len(steps)
+            if self.sop_machine is not None:
+                self.sop_machine.jump(self.now_step)
+
+    # ~~~~~~~~~~~~~~~~~~~~~~model loading~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def on_model_progress(self, percent: int, message: str):
+        self.model_progress.setValue(percent)
+        self.statusBar().showMessage(message)
+
+    def on_model_failed(self, message: str):
+        self.model_progress.setVisible(False)
+        self.statusBar().showMessage(f"Failed to load models: {message}")
+        print(f"Failed to load models: {message}")
+
+    def models_ready(self) -> bool:
+        """確保模型已載入；仍在載入時等待背景執行緒完成"""
+        if self.engine is not None:
+            return True
+        if not self.model_loader.ready:
+            print("Waiting for models...")
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            self.pose_model, self.object_model = self.model_loader.wait()
+        except Exception:
+            return False
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        self.engine = InferenceEngine(self.pose_model, self.object_model)
+        self.pipeline = InferencePipeline(self.engine, self.sop_machine)
+        self.pipeline.result_ready.connect(self.on_result)
+        self.model_progress.setVisible(False)
+        return True
 
     # ~~~~~~~~~~~~~~~~~~~~~~     ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def ask_for_offsets(self):
@@ -231,6 +323,15 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.update_label_size()
         for timer in self.timers:
             timer.stop()
+        if self.cameras is not None:
+            self.cameras.release()
+            self.cameras = None
+        if self.pipeline is not None:
+            self.pipeline.reset_smoothing()
+        self.scheduler.reset()
+        self.last_result = None
+        if self.engine is not None:
+            self.engine.reset()
 
     # ~~~~~~~~~~~~~~~~~~~~~~offset_slider~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def open_offset_slider(self):
@@ -243,19 +344,43 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.dialog.offset_changed.connect(self.update_offsets)
         self.dialog.cancel_signal.connect(self.reset_offsets)
         self.dialog.PictureSetCalled.connect(self.closedialog)
-        self.dialog.exec()
+        self.offset_preview = True
+        accepted = self.dialog.exec() == QDialog.DialogCode.Accepted
+        self.offset_preview = False
+        self.refresh_last_result()
+        print(
+            "Offsets:",
+            " ".join(f"[{key}: {self.offsets[key]:.3f}]" for key in self.offsets),
+        )
+        if accepted:
+            self.save_current_profile()
 
     def update_offsets(self, stop_x, stop_y, feed_x, feed_y):
+        # 整個 dict 一次替換，pipeline 在送出每組畫面時複製，推論不會看到只更新一半的偏移值
         self.offsets = {
             "stop_x": stop_x,
             "stop_y": stop_y,
             "feed_x": feed_x,
             "feed_y": feed_y,
         }
-        print(
-            "Offsets updated:",
-            " ".join(f"[{key}: {self.offsets[key]:.3f}]" for key in self.offsets),
-        )
+        # 播放中由下一張畫面顯示，否則在最後一組畫面上重畫，不需要重新推論
+        if not any(timer.isActive() for timer in self.timers):
+            self.refresh_last_result()
+
+    def refresh_last_result(self):
+        if self.last_result is not None:
+            self.show_result(self.last_result.frames, self.preview_offsets(self.last_result.images, self.last_result))
+
+    def preview_offsets(self, images: list[MatLike], result: FrameResult) -> list[MatLike]:
+        """偏移值滑桿開啟時，在控制器攝影機（1 號，只有一台時為 0 號）的畫面上標出調整後的手腕位置"""
+        if not self.offset_preview:
+            return images
+        idx = 1 if len(images) > 1 else 0
+        if idx >= len(result.pose_results):
+            return images
+        images = list(images)
+        images[idx] = draw_offset_preview(images[idx].copy(), result.pose_results[idx], self.offsets)
+        return images
 
     def reset_offsets(self, stop_x, stop_y, feed_x, feed_y):
         self.offsets = {
@@ -281,31 +406,156 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # for timer in self.timers:
         #     timer.stop()
         # TODO: objects範圍寬限值
+        # 攝影機開啟時直接以即時畫面校正
+        if self.cameras is not None and len(self.cameras):
+            self.calibrate_from_camera()
+            return
+
         to_adj = True
         file_path = None
         if to_adj:
-            print("Selecting a picture...")
-            file_path = QFileDialog.getOpenFileName(self, dir="images", filter="*.jpg;*.png;*.jpeg")
+            print("Selecting a picture or a video...")
+            file_path = QFileDialog.getOpenFileName(self, dir="images", filter="*.jpg;*.png;*.jpeg;*.mp4")
             if file_path[0]:
                 file_path = file_path[0]
-                print(f"Opened picture: {file_path}")
+                print(f"Opened file: {file_path}")
             else:
                 to_adj = False
                 print("No picture selected.")
-        self.offsets = adj_offsets(to_adj, self.offsets, file_path, self.pose_model, self.object_model)
+        if not self.models_ready():
+            return
+        self.pipeline.wait_idle()  # 模型不可同時被推論執行緒使用
+        if to_adj and file_path.lower().endswith(".mp4"):
+            # 影片以多張畫面校正
+            self.offsets = calibrate(self.offsets, iter_clip_frames(file_path), self.pose_model, self.object_model)
+            self.save_current_profile(calibration={"source": file_path})
+        else:
+            self.offsets = adj_offsets(to_adj, self.offsets, file_path, self.pose_model, self.object_model)
+            if to_adj:
+                self.save_current_profile(calibration={"source": file_path})
 
-    def test(self, file: str | MatLike | list[str | MatLike]) -> list[MatLike]:
+    def calibrate_from_camera(self, reference_results: list | None = None) -> bool:
         """
-        Test an image or a single video frame and return the result.
+        以控制器攝影機（1 號，只有一台時為 0 號）接下來的多張即時畫面校正偏移值.
+
+        校正成功時才更新設定檔（reference_results 不為 None 時一併更新比對基準），回傳是否成功。
+        """
+        if not self.models_ready():
+            return False
+        self.pipeline.wait_idle()
+        grabber = self.cameras[1 if len(self.cameras) > 1 else 0]
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            offsets = calibrate(
+                self.offsets, grabber.iter_frames(CALIBRATION_FRAMES), self.pose_model, self.object_model
+            )
+        finally:
+            QApplication.restoreOverrideCursor()
+        if offsets is self.offsets:  # 可用畫面不足時 calibrate 回傳原本的偏移值
+            return False
+        self.offsets = offsets
+        self.save_current_profile(reference_results, calibration={"source": f"camera {grabber.index}"})
+        return True
+
+    # ~~~~~~~~~~~~~~~~~~~~~~profile~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def save_current_profile(self, reference_results: list | None = None, calibration: dict | None = None):
+        """將目前的偏移值（攝影機模式時包含 ROI 與解析度）寫入此機台的設定檔"""
+        profile = self.profile or Profile(machine_id())
+        profile.offsets = self.offsets.copy()
+        if self.cameras is not None and len(self.cameras):
+            profile.camera_order = [grabber.index for grabber in self.cameras.grabbers]
+            profile.resolutions = self.camera_resolutions()
+            if self.engine is not None and self.engine.rois is not None:
+                profile.set_regions(self.engine.rois.items())
+        if reference_results is not None:
+            profile.reference = reference_points(reference_results)
+        if calibration is not None:
+            profile.calibration = calibration | {"at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        self.profile = profile
+        print(f"Profile saved to {save_profile(profile)}")
+
+    def camera_resolutions(self) -> list[list[int]]:
+        return [
+            [int(grabber.get(cv2.CAP_PROP_FRAME_WIDTH)), int(grabber.get(cv2.CAP_PROP_FRAME_HEIGHT))]
+            for grabber in self.cameras.grabbers
+        ]
+
+    def apply_profile_rois(self):
+        if self.profile is not None and self.engine is not None and self.engine.rois is not None:
+            for idx, region in self.profile.regions().items():
+                self.engine.rois.set(idx, region)
+
+    def check_profile(self, frames: list[MatLike]):
+        """
+        以一組即時畫面檢查設定檔.
+
+        物件位置與設定檔相符時沿用偏移值與 ROI；不符時詢問是否以即時畫面重新校正，
+        校正成功後才以這組畫面取代設定檔的比對基準。設定檔還沒有比對基準時，直接以這組畫面作為基準。
+        """
+        self.profile_check_pending = False
+        self.apply_profile_rois()  # 模型可能在開啟攝影機之後才載入完成，在此套用
+        self.pipeline.wait_idle()  # 模型不可同時被推論執行緒使用
+        if self.profile is None:
+            return  # 第一次設定偏移值後才會建立設定檔
+        object_results = self.object_model.predict(frames, conf=OBJECT_CONF, verbose=False)
+        if not self.profile.reference:
+            print("Profile has no reference objects yet, using the current view.")
+            self.save_current_profile(reference_results=object_results)
+            return
+
+        ok, reason = validate_profile(self.profile, object_results, self.camera_resolutions())
+        if ok:
+            print(f"Profile check passed: {reason}")
+            return
+        print(f"Profile check failed: {reason}")
+        answer = QMessageBox.question(
+            self, "Profile check", f"The camera view does not match the saved profile ({reason}).\nRecalibrate now?"
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            print("Keeping the saved profile.")
+            return
+        if self.engine.rois is not None:
+            self.engine.rois.reset()  # 攝影機位置改變，ROI 重新設定
+        if not self.calibrate_from_camera(reference_results=object_results):
+            print("Recalibration failed, the saved profile is unchanged.")
+
+    def test(self, file: str | MatLike | list[str | MatLike], drop_if_busy: bool = True) -> bool:
+        """
+        Submit an image or a set of frames to the background inference pipeline.
 
         Args:
             file (str | MatLike | list[str | MatLike]): The file path or the image to test. It can also be a list of file paths or images.
+            drop_if_busy (bool): Skip the frames if inference is still running, otherwise queue them.
 
         Returns:
-            list[MatLike]: The processed images in a list.
+            bool: Whether the frames were accepted. Results arrive in `on_result`.
         """
-
-        image, behavior = predict_result(file, self.pose_model, self.object_model, self.offsets)
+        if not self.models_ready():
+            return False
+        return self.pipeline.submit(file, self.offsets, drop_if_busy, smooth=self.smooth_behavior)
+
+    def schedule_frames(self, frames: list[MatLike], note: str = ""):
+        """每張畫面都顯示，由 scheduler 依推論延遲決定是否送去推論；note 附加在狀態列"""
+        # 模型還在載入時只顯示畫面，不等待
+        if self.scheduler.tick() and self.pipeline is not None and not self.pipeline.busy:
+            if self.test(frames):
+                self.scheduler.submitted()
+        self.preview_frames(frames, note)
+
+    def preview_frames(self, frames: list[MatLike], note: str = ""):
+        """只顯示畫面，沿用最新的推論結果；note 附加在狀態列"""
+        images = frames
+        if self.last_result is not None:
+            images = self.preview_offsets(self.last_result.overlay(frames), self.last_result)
+        self.show_result(frames, images)
+        self.statusBar().showMessage(f"{self.scheduler.status()} {note}".strip())
+
+    def on_result(self, result: FrameResult):
+        """推論完成後在 GUI 執行緒更新狀態；單張圖片時同時顯示結果"""
+        self.scheduler.completed()
+        self.last_result = result
+        # SOP 步驟與警示使用推論執行緒中跨畫面平滑後的結果，避免隨單張畫面閃爍
+        behavior = result.smoothed or result.behavior
         print(f"Is hand on stop button: {behavior.is_hand_on_stop.name}")
         print(f"Is hand on feed button: {behavior.is_hand_on_feed.name}")
         print(f"Does knife collide with base: {behavior.is_knife_base_collided.name}")
@@ -315,32 +565,14 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # self.Label_KnifeBaseCollid_status.setText(f"Knife Base Collided: {behavior.is_knife_base_collided.name}")
         self.Label_HumanPose_status.setText(f"Human Pose: {behavior.human_pose.name}")
 
-        # switch SOP step TODO
-        cur_time = time.time()
-        match behavior.human_pose.name:
-            case "ARM_STRETCH":
-                if not self.sop_start:
-                    if not hasattr(self, "last_step_update") or cur_time - self.last_step_update > 20:
-                        self.now_step = 1
-                        self.update_step_label()
-                        self.last_step_update = cur_time
-                        self.sop_start = True
-            case "STAND":
-                if self.sop_start and self.now_step == 1:
-                    if not hasattr(self, "last_step_update") or cur_time - self.last_step_update > 20:
-                        self.now_step = 2
-                        self.update_step_label()
-                        self.last_step_update = cur_time
-            case "ARM_BEND":
-                if self.sop_start and self.now_step == 2:
-                    if not hasattr(self, "last_step_update") or cur_time - self.last_step_update > 25:
-                        self.now_step = 3
-                        self.update_step_label()
-                        self.last_step_update = cur_time
-                        self.sop_start = False
+        # SOP 步驟由推論執行緒中的狀態機 (texts/sop_machine.json) 切換，這裡只更新顯示
+        if result.sop is not None and result.sop.changed:
+            self.now_step = result.sop.step
+            self.update_step_label()
+        sop_state = self.sop_machine.state if self.sop_machine is not None else "manual"
 
         self.Label_KnifeBaseCollid_status.setText(
-            f"Knife Base Collided: {behavior.is_knife_base_collided.name}\nSOP start: {self.sop_start} Step:{self.now_step}"
+            f"Knife Base Collided: {behavior.is_knife_base_collided.name}\nSOP: {sop_state} Step:{self.now_step}"
         )
 
         # Safety alert
@@ -359,11 +591,34 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 pass
             # playsound("warning.mp3", block=False) # this module has lots of bugs
 
-        return image
+        # 影片與攝影機的畫面由計時器顯示
+        if not any(timer.isActive() for timer in self.timers):
+            self.show_result(result.frames, self.preview_offsets(result.images, result))
+
+    def show_result(self, frames: list[MatLike], images: list[MatLike]):
+        with profiler.span("display"):
+            self._show_result(frames, images)
+
+    def _show_result(self, frames: list[MatLike], images: list[MatLike]):
+        if self.camera_on:
+            for idx, image in enumerate(images):
+                if idx == 0:
+                    self.displays[self.input_media].show(image)
+                elif idx == 1:
+                    self.displays[self.output_media].show(image)
+                elif idx == 2:
+                    self.displays[self.output_media2].show(image)
+        else:
+            for label in self.labels:
+                if self.gridLayout_2.indexOf(label) != -1:
+                    self.displays[label].show(frames[0])
+                elif self.gridLayout.indexOf(label) != -1 and label.isVisible():
+                    self.displays[label].show(images[0])
 
     # 圖片開啟
     def open_picture(self):
         self.camera_on = 0
+        self.smooth_behavior = False
         self.change_mode()
 
         print("Selecting a picture...")
@@ -386,14 +641,12 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             if self.gridLayout_2.indexOf(label) != -1:
                 label.setPixmap(QPixmap(file_path))
         print("Testing picture...")
-        image = self.test(file_path)[0]
-        for label in self.labels:
-            if self.gridLayout.indexOf(label) != -1 and label.isVisible():
-                label.setPixmap(QPixmap.fromImage(convert2QImage(image)))
+        self.test(file_path, drop_if_busy=False)
 
     # 影片
     def open_video(self):
         self.camera_on = 0
+        self.smooth_behavior = True
         self.change_mode()
 
         print("Selecting a video...")
@@ -403,26 +656,24 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             print(f"Opened video: {file_path}")
             self.video = cv2.VideoCapture(file_path)
             video_fps = self.video.get(cv2.CAP_PROP_FPS)
-            self.video_timer.setInterval(1)
+            if video_fps == 0:
+                video_fps = 30
+            # 依影片原本的速度播放，推論頻率交給 scheduler 決定
+            self.scheduler = AdaptiveScheduler(video_fps)
+            self.video_timer.setInterval(int(1000 / video_fps))
             self.get_input_ratio()
             self.video_timer.start()
         else:
             print("No video selected.")
 
     def test_video(self):
-        ret, frame = self.video.read()
+        with profiler.span("capture"):
+            ret, frame = self.video.read()
         if not ret:
             self.video_timer.stop()
             print("Video finished...")
         else:
-            image = self.test(frame)[0]
-            print("Testing video...")
-            for label in self.labels:
-                if self.gridLayout_2.indexOf(label) != -1:
-                    label.setPixmap(QPixmap.fromImage(convert2QImage(frame)))
-            for label in self.labels:
-                if self.gridLayout.indexOf(label) != -1 and label.isVisible:
-                    label.setPixmap(QPixmap.fromImage(convert2QImage(image)))
+            self.schedule_frames([frame])
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~UI adjust~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def adjustmode_switch(self):
@@ -502,74 +753,84 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~camera test~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def open_camera(self):
         self.camera_on = 1
+        self.smooth_behavior = True
         self.change_mode()
 
-        # turn on camera from 0 to 4
-        self.video = []
-        for i in range(CAMERA_COUNT):
-            print(f"Turning on camera {i}...")
-            cap = cv2.VideoCapture(i)
+        # turn on camera from 0 to 4，每台攝影機由背景執行緒擷取；設定檔記錄各位置使用的攝影機
+        order = self.profile.camera_order if self.profile is not None else None
+        self.cameras = CameraGroup(CAMERA_COUNT, 640, 480, indices=order)
+        if not len(self.cameras):
+            print("No camera turned on.")
+            return
+        self.profile_check_pending = True
+        self.sync_dropped = 0
 
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            if not cap.isOpened():
-                print(f"Camera {i} did not turn on.")
-            else:
-                self.video.append(cap)
-                print(
-                    f"Camera {i} is on. Resolution: {cap.get(cv2.CAP_PROP_FRAME_WIDTH)}x{cap.get(cv2.CAP_PROP_FRAME_HEIGHT)}"
-                )
-
-        video_fps = self.video[0].get(cv2.CAP_PROP_FPS)
+        video_fps = self.cameras[0].get(cv2.CAP_PROP_FPS)
         if video_fps == 0:
             video_fps = 60
+        self.scheduler = AdaptiveScheduler(video_fps)
         self.camera_timer.setInterval(1000 / video_fps)
         self.get_input_ratio()
         self.camera_timer.start()
 
     def test_camera(self):
         print("==================")
-        # test_time = time.time()
-
-        # frame_time = time.time()
-        frames = []
-        for idx, video in enumerate(self.video):
-            ret, frame = video.read()
-
-            if not ret:
-                if idx == 0:
-                    self.camera_timer.stop()
-                    return
-            else:
-                frames.append(frame)
-                print(f"Appended camera {idx}...")
+        if not self.cameras.is_alive():
+            self.camera_timer.stop()
+            return
+
+        # 取得擷取時間對齊的一組畫面，不會等待攝影機；無法對齊時略過這次
+        with profiler.span("capture"):
+            frame_set = self.cameras.read_synced()
+        if frame_set is None:
+            self.preview_dropped()
+            return
+        frames = frame_set.frames
+        # 第一組畫面（且模型已載入）時檢查設定檔
+        if self.profile_check_pending and self.engine is not None:
+            self.check_profile(frames)
+
+        for stat in self.cameras.stats():
+            print(f"Camera {stat['camera']}: {stat['fps']:.1f} FPS, dropped {stat['dropped']}")
+        sync = self.cameras.assembler.stats()
+        print(
+            f"Frame set skew: {frame_set.skew * 1000:.1f} ms, age: {frame_set.age * 1000:.1f} ms "
+            f"(p95 {sync['skew_p95_ms']:.1f} ms, dropped {sync['dropped']}, interpolated {sync['interpolated']})"
+        )
 
-            if self.take_picture_flag and idx == self.now_big_camera():
+        if self.take_picture_flag:
+            idx = self.now_big_camera()
+            if idx is not None and idx < len(frames):
                 filename = os.path.join(
                     self.target_folder,
                     f"captured_{idx}_{time.strftime('%Y%m%d_%H%M%S')}.jpg",
                 )
                 os.makedirs(self.target_folder, exist_ok=True)
-                cv2.imwrite(filename, frame)
+                cv2.imwrite(filename, frames[idx])
                 print(f"saved {filename}")
-                self.take_picture_flag = False
+            self.take_picture_flag = False
 
-        # print(f"Frame Time: {(time.time() - frame_time)*1000:.2f} ms")
-
-        images = self.test(frames)
-        # show_time = time.time()
-        for idx, image in enumerate(images):
-            if idx == 0:
-                self.input_media.setPixmap(QPixmap.fromImage(convert2QImage(image)))
-            elif idx == 1:
-                self.output_media.setPixmap(QPixmap.fromImage(convert2QImage(image)))
-            elif idx == 2:
-                self.output_media2.setPixmap(QPixmap.fromImage(convert2QImage(image)))
+        self.schedule_frames(frames, f"| skew {frame_set.skew * 1000:.0f} ms (p95 {sync['skew_p95_ms']:.0f} ms)")
+        print("==================\n")
 
-        # print(f"Show Time: {(time.time() - show_time)*1000:.2f} ms")
+    def preview_dropped(self):
+        """
+        時間差過大而丟棄一組畫面時，仍顯示各攝影機最新的畫面（不送去推論）.
 
-        # print(f"Test Time: {(time.time() - test_time)*1000:.2f} ms")
-        print("==================\n")
+        持續無法對齊時預覽不會凍結，狀態列顯示目前的時間差；沒有新畫面時不做任何事。
+        """
+        assembler = self.cameras.assembler
+        if assembler.dropped == self.sync_dropped:
+            return
+        self.sync_dropped = assembler.dropped
+        frames = self.cameras.read()
+        if frames is None:
+            return
+        self.preview_frames(
+            frames,
+            f"| skew {assembler.last_skew * 1000:.0f} ms > {assembler.tolerance * 1000:.0f} ms, "
+            f"not synced ({assembler.dropped} dropped)",
+        )
 
     def now_big_camera(self):
         now_camera_n = 0
@@ -583,12 +844,19 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.take_picture_flag = True
 
     def stop_test(self):
-        self.sop_start = False
         self.now_step = 1
+        if self.sop_machine is not None:
+            self.sop_machine.reset()
+        if self.pipeline is not None:
+            self.pipeline.reset_smoothing()
         for timer in self.timers:
             timer.stop()
-        for video in self.video:
-            video.release()
+        if self.cameras is not None:
+            self.cameras.release()
+            self.cameras = None
+        if self.video is not None:
+            self.video.release()
+            self.video = None
         print("STOP!")
 
     # 連結按鈕
@@ -618,18 +886,64 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         self.video_timer.timeout.connect(self.test_video)
         self.camera_timer.timeout.connect(self.test_camera)
+        self.profile_timer.timeout.connect(self.update_profile_label)
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self).activated.connect(self.dump_profile)
+        QShortcut(QKeySequence("Ctrl+R"), self).activated.connect(self.reseed_rois)
+        QShortcut(QKeySequence("Ctrl+Shift+R"), self).activated.connect(self.edit_roi)
+        QShortcut(QKeySequence("Ctrl+L"), self).activated.connect(self.next_sop_language)
+
+    def reseed_rois(self):
+        """清除所有 ROI，由下一次可信的完整畫面偵測結果重新設定"""
+        if self.engine is not None and self.engine.rois is not None:
+            self.engine.rois.reset()
+            print("ROIs cleared, reseeding from the next confident detection.")
+
+    def edit_roi(self):
+        """在目前大畫面的攝影機上框選物件偵測的 ROI；不框選則清除該攝影機的 ROI"""
+        if self.engine is None or self.engine.rois is None or self.last_result is None:
+            return
+        idx = self.now_big_camera() if self.camera_on else 0
+        if idx is None or idx >= len(self.last_result.frames):
+            return
+        x, y, w, h = cv2.selectROI(f"ROI camera {idx}", self.last_result.frames[idx], showCrosshair=False)
+        cv2.destroyWindow(f"ROI camera {idx}")
+        self.engine.rois.set(idx, Region(x, x + w, y, y + h) if w and h else None)
+        print(f"Camera {idx} ROI: {self.engine.rois.get(idx)}")
+        if self.camera_on:
+            self.save_current_profile()
+
+    def update_profile_label(self):
+        self.profile_label.setText(f"p50/p95/p99 ms: {profiler.format()}")
+
+    def dump_profile(self):
+        os.makedirs("outputs", exist_ok=True)
+        path = os.path.join("outputs", f"profile_{time.strftime('%Y%m%d_%H%M%S')}.csv")
+        profiler.dump_csv(path)
+        print(f"Profile saved to {path}")
 
     # 獲得input長寬比
     def get_input_ratio(self):
-        if isinstance(self.video, list):
-            frame_width = int(self.video[0].get(cv2.CAP_PROP_FRAME_WIDTH))
-            frame_height = int(self.video[0].get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if self.camera_on:
+            frame_width = int(self.cameras[0].get(cv2.CAP_PROP_FRAME_WIDTH))
+            frame_height = int(self.cameras[0].get(cv2.CAP_PROP_FRAME_HEIGHT))
         else:
             frame_width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
             frame_height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.aspect_ratio = frame_width / frame_height
         self.update_label_size()
 
+    def closeEvent(self, event):
+        if self.cameras is not None:
+            # 保存自動設定的 ROI
+            if self.profile is not None:
+                self.save_current_profile()
+            self.cameras.release()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.engine.close()
+        self.model_loader.close()
+        super().closeEvent(event)
+
     # 當視窗大小改變時呼叫
     def resizeEvent(self, event):
         super().resizeEvent(event)
@@ -0,0 +1,53 @@
+import random
+
+from pmc_5axis_yolo.utils import LabelRegistry, generate_colors
+
+NAMES = {0: "base", 1: "feed", 2: "knife", 3: "stop"}
+
+
+def legacy_generate_colors(num_classes):
+    """原本每次呼叫都以 random.seed(42) 重設全域 random 的 generate_colors"""
+    random.seed(42)
+    colors = {}
+    for i in range(num_classes):
+        colors[i] = (
+            random.randint(0, 255),
+            random.randint(0, 255),
+            random.randint(0, 255),
+        )
+    return colors
+
+
+def test_generate_colors_unchanged():
+    state = random.getstate()
+    expected = legacy_generate_colors(len(NAMES))
+    random.setstate(state)
+
+    assert generate_colors(len(NAMES)) == expected
+
+
+def test_registry_colors_match_generate_colors():
+    registry = LabelRegistry(NAMES)
+    expected = legacy_generate_colors(len(NAMES))
+
+    assert registry.colors.shape == (len(NAMES), 3)
+    for class_id, color in expected.items():
+        assert tuple(registry.colors[class_id].tolist()) == color
+        assert registry.color(class_id) == color
+
+
+def test_registry_does_not_touch_global_random():
+    random.seed(1234)
+    state = random.getstate()
+    LabelRegistry(NAMES)
+    generate_colors(len(NAMES))
+
+    assert random.getstate() == state
+
+
+def test_registry_labels():
+    registry = LabelRegistry(NAMES)
+
+    assert registry.label(3, 87)[0] == "stop 0.87"
+    assert registry.label(0, 100)[0] == "base 1.00"
+    assert registry.label(9, 50)[0] == "class_9 0.50"
@@ -0,0 +1,25 @@
+from pmc_5axis_yolo.tasks.sop import SopDocument
+
+
+def test_blank_lines_keep_step_numbers(tmp_path):
+    (tmp_path / "SOP_step.txt").write_text("first\n\nthird\n", encoding="utf-8")
+    (tmp_path / "steps_table.txt").write_text("a.txt\n\nc.txt\n", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("step a", encoding="utf-8")
+    (tmp_path / "c.txt").write_text("step c", encoding="utf-8")
+    document = SopDocument(str(tmp_path))
+
+    assert len(document) == 3
+    assert [document.title(i) for i in (1, 2, 3)] == ["first", "", "third"]
+    assert [document.text(i) for i in (1, 2, 3)] == ["step a", "", "step c"]
+
+
+def test_translation_falls_back_to_the_original(tmp_path):
+    (tmp_path / "SOP_step.txt").write_text("準備\n", encoding="utf-8")
+    (tmp_path / "SOP_step.en.txt").write_text("Prepare\n", encoding="utf-8")
+    (tmp_path / "steps_table.txt").write_text("a.txt\n", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("說明", encoding="utf-8")
+
+    document = SopDocument(str(tmp_path), language="en")
+    assert document.title(1) == "Prepare"
+    assert document.text(1) == "說明"
+    assert document.languages() == ["en"]
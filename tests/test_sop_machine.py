@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from pmc_5axis_yolo.tasks import SopMachine, replay
+from pmc_5axis_yolo.tasks.predict import Behavior, PoseState
+
+RULES = os.path.join(os.path.dirname(__file__), "..", "texts", "sop_machine.json")
+
+
+def record(timestamp: float, pose: str, source: str = "clip") -> dict:
+    return {"source": source, "frame": int(timestamp * 10), "timestamp": timestamp, "smoothed_human_pose": pose}
+
+
+def test_default_rules_follow_the_sop():
+    machine = SopMachine.from_file(RULES)
+    timeline = [
+        record(0.0, "UNKNOWN"),
+        record(1.0, "ARM_STRETCH"),  # 開始，第 1 步
+        record(5.0, "STAND"),  # cooldown 20 秒內不切換
+        record(22.0, "STAND"),  # 第 2 步
+        record(30.0, "ARM_BEND"),
+        record(48.0, "ARM_BEND"),  # 第 3 步
+    ]
+    changes = replay(machine, timeline)
+
+    assert [(c["timestamp"], c["to"], c["step"]) for c in changes] == [
+        (1.0, "preparing", 1),
+        (22.0, "dry_run", 2),
+        (48.0, "running", 3),
+    ]
+
+
+def test_dwell_requires_a_continuous_guard():
+    machine = SopMachine(
+        {
+            "states": {"a": {"step": 1}, "b": {"step": 2}},
+            "transitions": [{"from": "a", "to": "b", "when": {"human_pose": "STAND"}, "dwell": 2}],
+        }
+    )
+    stand = Behavior(human_pose=PoseState.STAND)
+    assert not machine.update(stand, 0.0).changed
+    assert not machine.update(Behavior(), 1.0).changed  # 中斷後重新計算
+    assert not machine.update(stand, 2.0).changed
+    assert machine.update(stand, 4.0).changed
+    assert machine.status.step == 2
+
+
+def test_each_source_starts_from_the_initial_state():
+    machine = SopMachine.from_file(RULES)
+    changes = replay(machine, [record(1.0, "ARM_STRETCH", "a"), record(2.0, "ARM_STRETCH", "b")])
+
+    assert [c["source"] for c in changes] == ["a", "b"]
+
+
+def test_jump_moves_to_the_first_state_of_a_step():
+    machine = SopMachine.from_file(RULES)
+
+    assert machine.jump(2).state == "dry_run"
+    assert machine.jump(1).state == "idle"
+
+
+def test_unknown_guard_value_is_rejected():
+    with pytest.raises(ValueError):
+        SopMachine(
+            {
+                "states": {"a": {"step": 1}},
+                "transitions": [{"from": "a", "to": "a", "when": {"human_pose": "SITTING"}}],
+            }
+        )